@@ -1,16 +1,28 @@
 import logging
 import os
+import hmac
 import json
-from typing import Dict, Any
-from fastapi import FastAPI, UploadFile, Form, HTTPException, BackgroundTasks, Request, Response, Cookie, Depends
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from fastapi import FastAPI, UploadFile, Form, Header, HTTPException, Request, Response, Cookie, Depends
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from backend.stt import transcribe_audio
-from backend.webhook import send_to_n8n
-from backend.tts import text_to_speech
+from backend.tts import TextToSpeechService
+from backend.services import ServiceContainer, get_services, get_sessions, get_tts
+from backend.session import SessionStorage
+from backend.endpoints import EndpointRegistry, N8nEndpoint
+from backend.idempotency import IdempotencyManager
+from backend.lifecycle import TurnTracker, SHUTDOWN_DRAIN_TIMEOUT, shutdown_remaining
+from backend.events import EventBroker
+from backend.utils.single_flight import SingleFlight
+from backend.utils.audio import mp3_duration
+from backend.utils.batch import run_batch, summarize_batch
+from backend.utils.file_manager import FileManager
 
 # Konfiguracja loggera
 logging.basicConfig(
@@ -19,11 +31,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Uruchamia i zamyka zasoby aplikacji.
+    Zamykanie aplikacji następuje po tym, jak serwer poczekał na otwarte połączenia,
+    dlatego zadania w tle (generowanie TTS) dostają tylko czas pozostały
+    do wspólnego terminu zamykania; potem zamykane są pule połączeń.
+    """
+    # Serwisy STT/TTS/webhooka są tworzone przy pierwszym użyciu
+    app.state.services = ServiceContainer(app_version=app.version)
+    # Sesje z historią rozmów (opcjonalnie odtwarzaną z dziennika w tle)
+    app.state.sessions = SessionStorage(history_log_path=os.getenv("HISTORY_LOG_PATH"))
+    turn_tracker.spawn(app.state.sessions.restore_history())
+    # Utwórz pule połączeń do endpointów n8n; sondy rozgrzewające działają w tle
+    await endpoint_registry.start()
+    turn_tracker.start_accepting()
+    yield
+    turn_tracker.stop_accepting()
+    await turn_tracker.drain(shutdown_remaining(SHUTDOWN_DRAIN_TIMEOUT))
+    await app.state.services.close()
+    app.state.sessions.close()
+    await endpoint_registry.close()
+
 # Inicjalizacja FastAPI
 app = FastAPI(
     title="N8N Voice Interface",
     description="Interfejs głosowy dla n8n wykorzystujący OpenAI's GPT-4o Transcribe",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Dodaj middleware CORS
@@ -39,143 +75,344 @@ app.add_middleware(
 last_n8n_response = None
 last_tts_file_path = None
 
+# Rejestr dozwolonych endpointów n8n
+endpoint_registry = EndpointRegistry.from_env()
+
+# Wyniki tur zapisane dla kluczy idempotencji
+idempotency = IdempotencyManager()
+
+# Trwające tury i zadania w tle, na które czeka zamykanie aplikacji
+turn_tracker = TurnTracker()
+
+# Zdarzenia wysyłane do przeglądarek przez /api/events
+event_broker = EventBroker()
+
+# Sekret wymagany (nagłówek X-Push-Token) do wysyłania wiadomości push przez /api/speak;
+# bez niego push jest wyłączony
+SPEAK_PUSH_TOKEN = os.getenv("SPEAK_PUSH_TOKEN", "")
+
+# Limity żądań wsadowych
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+def resolve_webhook(webhook: Optional[str], webhook_url: Optional[str]) -> Tuple[str, Optional[N8nEndpoint]]:
+    """
+    Ustal docelowy URL webhooka na podstawie nazwy endpointu lub URL od klienta.
+    
+    Args:
+        webhook: Nazwa zarejestrowanego endpointu n8n
+        webhook_url: URL webhooka podany przez klienta
+    
+    Returns:
+        Krotka (URL webhooka, zarejestrowany endpoint lub None)
+    """
+    if webhook:
+        endpoint = endpoint_registry.get(webhook)
+        if endpoint is None:
+            raise HTTPException(status_code=404, detail=f"Nieznany endpoint n8n: {webhook}")
+        return endpoint.url, endpoint
+    
+    if webhook_url:
+        endpoint = endpoint_registry.find_by_url(webhook_url)
+        if endpoint is not None:
+            return endpoint.url, endpoint
+        if not endpoint_registry.allow_custom_urls:
+            raise HTTPException(status_code=403, detail="URL webhooka nie znajduje się na liście dozwolonych")
+        return webhook_url, None
+    
+    raise HTTPException(status_code=400, detail="Wymagana nazwa endpointu (webhook) lub URL webhooka (webhook_url)")
+
+# Czas życia ciasteczka sesji (30 dni)
+SESSION_COOKIE_MAX_AGE = 30 * 24 * 3600
+
+def resolve_session(sessions: SessionStorage, session_id: Optional[str], response: Response) -> str:
+    """
+    Ustal identyfikator sesji z ciasteczka lub utwórz nową sesję.
+    
+    Args:
+        sessions: Magazyn sesji
+        session_id: Identyfikator sesji z ciasteczka (jeśli istnieje)
+        response: Odpowiedź HTTP, w której ustawiane jest ciasteczko nowej sesji
+    
+    Returns:
+        Identyfikator sesji
+    """
+    resolved_id = sessions.get_or_create_session_id(session_id)
+    if resolved_id != session_id:
+        response.set_cookie(
+            "session_id", resolved_id, max_age=SESSION_COOKIE_MAX_AGE, httponly=True, samesite="lax"
+        )
+    return resolved_id
+
+def ensure_n8n_ok(n8n_response: Any) -> None:
+    """
+    Zgłoś błąd 502, jeśli komunikacja z n8n się nie powiodła.
+    Dzięki temu błąd nie jest zapisywany jako wynik tury i ponowienie wykona ją jeszcze raz.
+    """
+    if isinstance(n8n_response, dict) and n8n_response.get("error"):
+        raise HTTPException(status_code=502, detail=n8n_response.get("text") or "Błąd komunikacji z n8n")
+
+def record_turn(sessions: SessionStorage, session_id: str, user_text: str, n8n_response: Any) -> None:
+    """
+    Zapisz wiadomość użytkownika i odpowiedź n8n w historii rozmowy sesji.
+    """
+    sessions.append_history(session_id, "user", user_text)
+    if isinstance(n8n_response, dict) and n8n_response.get("text"):
+        sessions.append_history(session_id, "assistant", n8n_response["text"])
+
 # Model dla odbierania tekstu z n8n
 class TextRequest(BaseModel):
     text: str
+    # push=true wysyła wiadomość do połączonych przeglądarek (wybranej sesji lub wszystkich)
+    push: bool = False
+    session_id: Optional[str] = None
 
 # Nowy model dla żądań tekstowych
 class TextMessageRequest(BaseModel):
     text: str
-    webhook_url: str
+    webhook_url: Optional[str] = None
+    webhook: Optional[str] = None
+
+# Model dla wsadowych wiadomości tekstowych
+class BatchTextMessageRequest(BaseModel):
+    texts: List[str]
+    webhook_url: Optional[str] = None
+    webhook: Optional[str] = None
+    speak: bool = False
+    concurrency: Optional[int] = None
+    stream: bool = False
+
+# Model dla wsadowej konwersji tekstu na mowę
+class BatchSpeakRequest(BaseModel):
+    texts: List[str]
+    concurrency: Optional[int] = None
+    stream: bool = False
+
+# Wykonaj turę z obsługą opcjonalnego klucza idempotencji
+async def run_idempotent_turn(
+    turn_key: Optional[str],
+    fingerprint: str,
+    run_turn: Callable[[], Awaitable[Dict[str, Any]]],
+    response: Response
+) -> Dict[str, Any]:
+    """
+    Wykonaj turę raz dla danego klucza idempotencji i odtwórz jej wynik przy ponowieniach.
+    
+    Args:
+        turn_key: Klucz idempotencji z zakresem endpointu (None, jeśli klient go nie podał)
+        fingerprint: Skrót treści żądania
+        run_turn: Funkcja wykonująca turę
+        response: Odpowiedź HTTP, do której dodawany jest nagłówek odtworzenia
+    
+    Returns:
+        Wynik tury
+    """
+    if turn_key is None:
+        async with turn_tracker.turn():
+            return await run_turn()
+    
+    async with turn_tracker.turn():
+        result, replayed = await idempotency.run(turn_key, fingerprint, run_turn)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
 # NOWY ENDPOINT: Endpoint do obsługi wiadomości tekstowych
 @app.post("/api/text-message")
 async def text_message_endpoint(
     request: TextMessageRequest,
-    background_tasks: BackgroundTasks = None
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    session_id: Optional[str] = Cookie(None),
+    services: ServiceContainer = Depends(get_services),
+    sessions: SessionStorage = Depends(get_sessions)
 ):
     """
     Przetwarza wiadomość tekstową i wysyła ją do N8N webhook.
+    Do webhooka dołączane jest okno kontekstu z historii rozmowy sesji.
     
     Args:
-        request: Obiekt zawierający tekst i URL webhooka
-        background_tasks: Zadania w tle
+        request: Obiekt zawierający tekst oraz nazwę endpointu lub URL webhooka
+        response: Odpowiedź HTTP
+        idempotency_key: Opcjonalny klucz idempotencji (ponowienia odtwarzają zapisany wynik)
+        session_id: Identyfikator sesji z ciasteczka
+        services: Kontener serwisów aplikacji
+        sessions: Magazyn sesji i historii rozmów
     
     Returns:
         Odpowiedź JSON z wiadomością i odpowiedzią n8n
     """
-    global last_n8n_response
+    webhook_url, endpoint = resolve_webhook(request.webhook, request.webhook_url)
+    session_id = resolve_session(sessions, session_id, response)
+    turn_key = f"text-message:{idempotency_key}" if idempotency_key else None
     
-    try:
-        text = request.text
-        webhook_url = request.webhook_url
-        
-        logger.info(f"Otrzymano wiadomość tekstową: {text[:50]}...")
+    async def run_turn() -> Dict[str, Any]:
+        global last_n8n_response
+        turn_id = uuid.uuid4().hex
         
-        # Wyślij do webhooka n8n 
-        n8n_response = await send_to_n8n(webhook_url, {"transcription": text})
-        
-        # Zapisz odpowiedź n8n globalnie
-        if isinstance(n8n_response, dict) and "text" in n8n_response:
-            last_n8n_response = n8n_response
-            logger.info(f"Zapisano odpowiedź n8n: {n8n_response['text'][:50]}...")
+        try:
+            text = request.text
             
-            # Generuj TTS dla odpowiedzi w tle
-            if background_tasks:
-                background_tasks.add_task(
-                    generate_tts_for_response,
-                    n8n_response["text"]
-                )
-            else:
-                await generate_tts_for_response(n8n_response["text"])
+            logger.info(f"Otrzymano wiadomość tekstową: {text[:50]}...")
+            
+            # Wyślij do webhooka n8n razem z kontekstem rozmowy
+            n8n_response = await services.webhook.send_to_n8n(
+                webhook_url,
+                {"transcription": text, "session_id": session_id, "context": sessions.get_context(session_id)},
+                endpoint=endpoint
+            )
+            ensure_n8n_ok(n8n_response)
+            record_turn(sessions, session_id, text, n8n_response)
+            
+            # Zapisz odpowiedź n8n globalnie
+            if isinstance(n8n_response, dict) and "text" in n8n_response:
+                last_n8n_response = n8n_response
+                logger.info(f"Zapisano odpowiedź n8n: {n8n_response['text'][:50]}...")
+                event_broker.publish(session_id, "reply", {"turn_id": turn_id, "text": n8n_response["text"]})
                 
-            # Zwróć zarówno wiadomość, jak i odpowiedź n8n
+                # Generuj TTS dla odpowiedzi w tle (zamykanie aplikacji poczeka na zakończenie)
+                turn_tracker.spawn(
+                    generate_tts_for_response(services, n8n_response["text"], turn_key, session_id, turn_id)
+                )
+                    
+                # Zwróć zarówno wiadomość, jak i odpowiedź n8n
+                return {
+                    "success": True,
+                    "text": text,
+                    "n8nResponse": n8n_response,
+                    "turn_id": turn_id
+                }
+            
             return {
                 "success": True,
                 "text": text,
-                "n8nResponse": n8n_response
+                "turn_id": turn_id
             }
         
-        return {
-            "success": True,
-            "text": text
-        }
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Błąd przetwarzania żądania tekstowego: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
     
-    except Exception as e:
-        logger.error(f"Błąd przetwarzania żądania tekstowego: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    fingerprint = SingleFlight.make_key(request.text, webhook_url)
+    return await run_idempotent_turn(turn_key, fingerprint, run_turn, response)
 
 # Endpoint API dla transkrypcji
 @app.post("/api/transcribe")
 async def transcribe_endpoint(
     audio: UploadFile,
-    webhook_url: str = Form(...),
-    background_tasks: BackgroundTasks = None
+    response: Response,
+    webhook_url: Optional[str] = Form(None),
+    webhook: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    session_id: Optional[str] = Cookie(None),
+    services: ServiceContainer = Depends(get_services),
+    sessions: SessionStorage = Depends(get_sessions)
 ):
     """
     Przetwórz audio, transkrybuj je i wyślij do webhooka n8n.
+    Do webhooka dołączane jest okno kontekstu z historii rozmowy sesji.
+    Ponowienia z tym samym nagłówkiem Idempotency-Key odtwarzają zapisany wynik.
     """
-    global last_n8n_response
+    webhook_url, endpoint = resolve_webhook(webhook, webhook_url)
+    session_id = resolve_session(sessions, session_id, response)
+    turn_key = f"transcribe:{idempotency_key}" if idempotency_key else None
     
-    try:
-        logger.info(f"Otrzymano plik audio: {audio.filename}, rozmiar: {audio.size} bajtów")
-        
-        # Transkrybuj audio
-        transcription_result = await transcribe_audio(audio)
-        
-        if not transcription_result or not transcription_result.get("text"):
-            logger.error("Transkrypcja nie powiodła się lub zwróciła pusty wynik")
-            raise HTTPException(status_code=500, detail="Transkrypcja nie powiodła się")
-        
-        transcribed_text = transcription_result["text"]
-        logger.info(f"Transkrypcja pomyślna: {transcribed_text[:50]}...")
-        
-        # Wyślij do webhooka n8n i pobierz odpowiedź
-        n8n_response = await send_to_n8n(webhook_url, {"transcription": transcribed_text})
+    logger.info(f"Otrzymano plik audio: {audio.filename}, rozmiar: {audio.size} bajtów")
+    content = await audio.read()
+    
+    async def run_turn() -> Dict[str, Any]:
+        global last_n8n_response
+        turn_id = uuid.uuid4().hex
         
-        # Zapisz odpowiedź n8n globalnie
-        if isinstance(n8n_response, dict) and "text" in n8n_response:
-            last_n8n_response = n8n_response
-            logger.info(f"Zapisano odpowiedź n8n: {n8n_response['text'][:50]}...")
+        try:
+            # Transkrybuj audio
+            transcription_result = await services.stt.transcribe(content)
             
-            # Generuj TTS dla odpowiedzi od razu, aby było gotowe
-            if background_tasks:
-                background_tasks.add_task(
-                    generate_tts_for_response,
-                    n8n_response["text"]
-                )
-            else:
-                await generate_tts_for_response(n8n_response["text"])
+            if not transcription_result or not transcription_result.get("text"):
+                logger.error("Transkrypcja nie powiodła się lub zwróciła pusty wynik")
+                raise HTTPException(status_code=500, detail="Transkrypcja nie powiodła się")
+            
+            transcribed_text = transcription_result["text"]
+            logger.info(f"Transkrypcja pomyślna: {transcribed_text[:50]}...")
+            
+            # Wyślij do webhooka n8n i pobierz odpowiedź
+            n8n_response = await services.webhook.send_to_n8n(
+                webhook_url,
+                {"transcription": transcribed_text, "session_id": session_id, "context": sessions.get_context(session_id)},
+                endpoint=endpoint
+            )
+            ensure_n8n_ok(n8n_response)
+            record_turn(sessions, session_id, transcribed_text, n8n_response)
+            
+            # Zapisz odpowiedź n8n globalnie
+            if isinstance(n8n_response, dict) and "text" in n8n_response:
+                last_n8n_response = n8n_response
+                logger.info(f"Zapisano odpowiedź n8n: {n8n_response['text'][:50]}...")
+                event_broker.publish(session_id, "reply", {"turn_id": turn_id, "text": n8n_response["text"]})
                 
-            # Zwróć zarówno transkrypcję, jak i odpowiedź n8n
+                # Generuj TTS dla odpowiedzi od razu, aby było gotowe
+                turn_tracker.spawn(
+                    generate_tts_for_response(services, n8n_response["text"], turn_key, session_id, turn_id)
+                )
+                    
+                # Zwróć zarówno transkrypcję, jak i odpowiedź n8n
+                return {
+                    "success": True,
+                    "text": transcribed_text,
+                    "n8nResponse": n8n_response,
+                    "turn_id": turn_id
+                }
+            
             return {
                 "success": True,
                 "text": transcribed_text,
-                "n8nResponse": n8n_response
+                "turn_id": turn_id
             }
         
-        return {
-            "success": True,
-            "text": transcribed_text
-        }
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Błąd przetwarzania żądania: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
     
-    except Exception as e:
-        logger.error(f"Błąd przetwarzania żądania: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    fingerprint = SingleFlight.make_key(content, webhook_url)
+    return await run_idempotent_turn(turn_key, fingerprint, run_turn, response)
 
 # Funkcja do generowania TTS dla odpowiedzi n8n
-async def generate_tts_for_response(text: str):
+async def generate_tts_for_response(
+    services: ServiceContainer,
+    text: str,
+    turn_key: Optional[str] = None,
+    session_id: Optional[str] = None,
+    turn_id: Optional[str] = None
+):
     """
     Generuj TTS dla odpowiedzi n8n i zapisz ścieżkę pliku.
+    Jeśli tura ma klucz idempotencji, adres audio jest dołączany do zapisanego wyniku.
+    Przeglądarki sesji są powiadamiane zdarzeniem "audio" (lub "audio_failed").
     """
     global last_tts_file_path
     
     try:
-        file_path = await text_to_speech(text)
+        file_path = await services.tts.text_to_speech(text)
         last_tts_file_path = file_path
         logger.info(f"Wygenerowano TTS dla odpowiedzi n8n, zapisano do: {file_path}")
+        audio_url = f"/api/audio/{os.path.basename(file_path)}"
+        
+        if turn_key:
+            await idempotency.update_result(turn_key, {"audio_url": audio_url})
+        if session_id:
+            event_broker.publish(session_id, "audio", {
+                "turn_id": turn_id,
+                "audio_url": audio_url,
+                "duration": mp3_duration(file_path)
+            })
     except Exception as e:
         logger.error(f"Błąd generowania TTS dla odpowiedzi n8n: {str(e)}")
+        if session_id:
+            event_broker.publish(session_id, "audio_failed", {"turn_id": turn_id, "error": str(e)})
 
 # Endpoint do pobierania ostatniej odpowiedzi n8n
 @app.post("/api/get-n8n-response")
@@ -190,7 +427,7 @@ async def get_n8n_response():
 
 # Endpoint do pobierania ostatniego pliku TTS z tekstem w treści odpowiedzi
 @app.get("/api/last-response-tts")
-async def get_last_response_tts():
+async def get_last_response_tts(tts: TextToSpeechService = Depends(get_tts)):
     """
     Pobierz plik TTS audio dla ostatniej odpowiedzi n8n.
     """
@@ -200,7 +437,7 @@ async def get_last_response_tts():
         if last_n8n_response and "text" in last_n8n_response:
             # Spróbuj wygenerować plik TTS, jeśli nie istnieje
             try:
-                last_tts_file_path = await text_to_speech(last_n8n_response["text"])
+                last_tts_file_path = await tts.text_to_speech(last_n8n_response["text"])
             except Exception as e:
                 logger.error(f"Błąd generowania pliku TTS: {str(e)}")
                 raise HTTPException(status_code=500, detail="Nie udało się wygenerować pliku TTS")
@@ -225,27 +462,39 @@ async def get_audio_file(filename: str):
     """
     Serwuj plik audio po nazwie pliku.
     """
-    global last_tts_file_path
-    
-    if not last_tts_file_path or not os.path.exists(last_tts_file_path):
+    # Serwuj tylko pliki TTS wygenerowane przez aplikację (nazwa tts_<uuid>.mp3)
+    file_path = FileManager.find_temp_file(filename, prefix="tts", suffix=".mp3")
+    if not file_path:
         raise HTTPException(status_code=404, detail="Nie znaleziono pliku audio")
     
-    # Prosta walidacja, aby zapobiec atakom traversal path
-    if os.path.basename(last_tts_file_path) != filename:
-        raise HTTPException(status_code=403, detail="Dostęp zabroniony")
-    
     # Strumień zawartości pliku bezpośrednio
     def iterfile():
-        with open(last_tts_file_path, mode="rb") as file_like:
+        with open(file_path, mode="rb") as file_like:
             yield from file_like
     
     return StreamingResponse(iterfile(), media_type="audio/mpeg")
 
 # Nowy endpoint do odbierania tekstu z n8n i konwersji na mowę
+def authorize_push(request: TextRequest, push_token: Optional[str] = Header(None, alias="X-Push-Token")) -> None:
+    """Sprawdź token wymagany do wysłania wiadomości push (przed generowaniem audio)"""
+    if not request.push:
+        return
+    if not SPEAK_PUSH_TOKEN:
+        raise HTTPException(status_code=403, detail="Wiadomości push są wyłączone (brak SPEAK_PUSH_TOKEN)")
+    if not push_token or not hmac.compare_digest(push_token.encode(), SPEAK_PUSH_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Nieprawidłowy token push")
+
 @app.post("/api/speak")
-async def speak_endpoint(request: TextRequest):
+async def speak_endpoint(
+    request: TextRequest,
+    _: None = Depends(authorize_push),
+    tts: TextToSpeechService = Depends(get_tts)
+):
     """
     Odbierz tekst i konwertuj go na mowę.
+    Z push=true wiadomość jest wysyłana zdarzeniem "speak" do przeglądarek
+    połączonych z /api/events (sesji session_id lub wszystkich);
+    wymaga nagłówka X-Push-Token zgodnego z SPEAK_PUSH_TOKEN.
     """
     global last_n8n_response, last_tts_file_path
     
@@ -257,24 +506,176 @@ async def speak_endpoint(request: TextRequest):
         last_n8n_response = {"text": text}
         
         # Konwertuj tekst na mowę
-        audio_path = await text_to_speech(text)
+        audio_path = await tts.text_to_speech(text)
         
         # Zapisz ścieżkę pliku TTS
         last_tts_file_path = audio_path
         
         # Utwórz unikalny URL audio z ścieżki pliku
         audio_url = f"/api/audio/{os.path.basename(audio_path)}"
+        result = {"text": text, "audio_url": audio_url}
+        
+        # Wyślij wiadomość do połączonych przeglądarek
+        if request.push:
+            message = {**result, "duration": mp3_duration(audio_path)}
+            if request.session_id:
+                # Zdarzenie trafia do zapisanych zdarzeń sesji, ale dostarczone jest tylko połączonej
+                delivered = event_broker.is_connected(request.session_id)
+                event_broker.publish(request.session_id, "speak", message)
+                result["delivered_sessions"] = int(delivered)
+            else:
+                result["delivered_sessions"] = event_broker.broadcast("speak", message)
         
         # Zwróć JSON z tekstem i URL audio
-        return {
-            "text": text,
-            "audio_url": audio_url
-        }
+        return result
     
     except Exception as e:
         logger.error(f"Błąd przetwarzania żądania speak: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Przetwórz paczkę elementów i zwróć wyniki jako JSON lub strumień NDJSON
+async def batch_response(
+    texts: List[str],
+    worker: Callable[[str], Awaitable[Dict[str, Any]]],
+    concurrency: Optional[int],
+    stream: bool
+):
+    """
+    Wykonaj zadania wsadowe z ograniczoną równoległością.
+    
+    Args:
+        texts: Teksty do przetworzenia
+        worker: Funkcja przetwarzająca pojedynczy tekst
+        concurrency: Żądana liczba równoległych zadań (ograniczona przez BATCH_MAX_CONCURRENCY)
+        stream: Czy zwracać wyniki jako NDJSON w miarę ich ukończenia
+    
+    Returns:
+        Wyniki wszystkich elementów z czasami i podsumowaniem przepustowości
+    """
+    if not texts:
+        raise HTTPException(status_code=400, detail="Lista tekstów nie może być pusta")
+    if len(texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Maksymalna liczba elementów w paczce to {BATCH_MAX_ITEMS}")
+    
+    concurrency = min(concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    turn_tracker.ensure_accepting()
+    logger.info(f"Przetwarzanie paczki: {len(texts)} elementów, równoległość: {concurrency}")
+    
+    if stream:
+        async def iter_results() -> AsyncIterator[str]:
+            async with turn_tracker.turn():
+                start = time.perf_counter()
+                results = []
+                async for result in run_batch(texts, worker, concurrency):
+                    results.append(result)
+                    yield json.dumps(result, ensure_ascii=False) + "\n"
+                summary = summarize_batch(results, time.perf_counter() - start)
+                yield json.dumps({"summary": summary}, ensure_ascii=False) + "\n"
+        
+        return StreamingResponse(iter_results(), media_type="application/x-ndjson")
+    
+    async with turn_tracker.turn():
+        start = time.perf_counter()
+        results = [result async for result in run_batch(texts, worker, concurrency)]
+        summary = summarize_batch(results, time.perf_counter() - start)
+    
+    results.sort(key=lambda result: result["index"])
+    return {"results": results, "summary": summary}
+
+# Endpoint wsadowy do wysyłania wielu wiadomości tekstowych do n8n
+@app.post("/api/batch/text-message")
+async def batch_text_message_endpoint(
+    request: BatchTextMessageRequest,
+    services: ServiceContainer = Depends(get_services)
+):
+    """
+    Wyślij wiele wiadomości tekstowych do webhooka n8n w jednym żądaniu.
+    Opcjonalnie (speak=true) generuje też mowę dla odpowiedzi n8n.
+    """
+    webhook_url, endpoint = resolve_webhook(request.webhook, request.webhook_url)
+    
+    async def process(text: str) -> Dict[str, Any]:
+        n8n_response = await services.webhook.send_to_n8n(webhook_url, {"transcription": text}, endpoint=endpoint)
+        # Błąd n8n oznacza element jako nieudany (success: false) w wynikach i podsumowaniu
+        ensure_n8n_ok(n8n_response)
+        result = {"text": text, "n8nResponse": n8n_response}
+        if request.speak and isinstance(n8n_response, dict) and n8n_response.get("text"):
+            audio_path = await services.tts.text_to_speech(n8n_response["text"])
+            result["audio_url"] = f"/api/audio/{os.path.basename(audio_path)}"
+        return result
+    
+    return await batch_response(request.texts, process, request.concurrency, request.stream)
+
+# Endpoint wsadowy do konwersji wielu tekstów na mowę
+@app.post("/api/batch/speak")
+async def batch_speak_endpoint(
+    request: BatchSpeakRequest,
+    services: ServiceContainer = Depends(get_services)
+):
+    """
+    Konwertuj wiele tekstów na mowę w jednym żądaniu.
+    """
+    async def process(text: str) -> Dict[str, Any]:
+        audio_path = await services.tts.text_to_speech(text)
+        return {"text": text, "audio_url": f"/api/audio/{os.path.basename(audio_path)}"}
+    
+    return await batch_response(request.texts, process, request.concurrency, request.stream)
+
+# Endpoint strumienia zdarzeń sesji (Server-Sent Events)
+@app.get("/api/events")
+async def events_endpoint(
+    session_id: Optional[str] = Cookie(None),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    sessions: SessionStorage = Depends(get_sessions)
+):
+    """
+    Strumień zdarzeń sesji: "reply" (gotowa odpowiedź n8n), "audio" (gotowe audio
+    odpowiedzi z adresem i długością), "audio_failed" oraz "speak" (wiadomości z /api/speak).
+    Przeglądarka (EventSource) łączy się ponownie po zamknięciu strumienia
+    i otrzymuje zdarzenia, które ją ominęły.
+    """
+    turn_tracker.ensure_accepting()
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = None
+    
+    async def stream() -> AsyncIterator[str]:
+        # Przy zamykaniu serwera strumień kończy się od razu, by nie wstrzymywać zamykania
+        async for chunk in event_broker.stream(resolved_id, last_id, is_open=lambda: turn_tracker.accepting):
+            yield chunk
+    
+    response = StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    resolved_id = resolve_session(sessions, session_id, response)
+    return response
+
+# Endpoint z listą zarejestrowanych endpointów n8n i ich statystykami
+@app.get("/api/endpoints")
+async def list_endpoints():
+    """
+    Pobierz stan zdrowia i statystyki opóźnień zarejestrowanych endpointów n8n.
+    """
+    return endpoint_registry.describe()
+
+# Endpoint z licznikami działania aplikacji
+@app.get("/api/metrics")
+async def metrics(services: ServiceContainer = Depends(get_services)):
+    """
+    Pobierz liczniki wywołań STT/TTS, w tym liczbę połączonych duplikatów,
+    oraz opóźnienia modeli STT i ostatnie decyzje routingu.
+    """
+    return {
+        "single_flight": services.stats(),
+        "stt_routing": services.stt_routing_stats(),
+        "idempotency": idempotency.stats(),
+        "turns": turn_tracker.stats(),
+        "events": event_broker.stats()
+    }
+
 # Endpoint sprawdzania stanu
 @app.get("/api/health")
 async def health_check():
@@ -286,8 +687,7 @@ async def health_check():
 # Zamontuj pliki statyczne dla frontendu
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
 
-# Uruchom aplikację
+# Uruchom aplikację (ustawienia produkcyjne; UVICORN_RELOAD=true dla trybu deweloperskiego)
 if __name__ == "__main__":
-    import uvicorn
-    port = int(os.getenv("PORT", "8000"))
-    uvicorn.run("app:app", host="0.0.0.0", port=port, reload=True)
+    from backend.server import main
+    main()
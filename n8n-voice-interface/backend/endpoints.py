@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urlsplit, urlunsplit
+
+# aiohttp jest importowany dopiero przy uruchamianiu pul, aby przyspieszyć start aplikacji
+if TYPE_CHECKING:
+    import aiohttp
+
+# Konfiguracja loggera
+logger = logging.getLogger(__name__)
+
+# Stałe konfiguracyjne
+DEFAULT_POOL_SIZE = int(os.getenv("N8N_POOL_SIZE", "10"))
+KEEPALIVE_TIMEOUT = float(os.getenv("N8N_KEEPALIVE_TIMEOUT", "75"))
+HEALTH_INTERVAL = float(os.getenv("N8N_HEALTH_INTERVAL", "30"))
+HEALTH_TIMEOUT = float(os.getenv("N8N_HEALTH_TIMEOUT", "5"))
+
+
+def default_health_url(url: str) -> str:
+    """
+    Wyznacza adres /healthz instancji n8n na podstawie URL webhooka.
+    Webhook produkcyjny odpowiada 404 także dla nieaktywnego workflow, więc nie nadaje się na sondę.
+    Uwzględnia instancje pod prefiksem ścieżki (np. https://host/n8n/webhook/abc -> https://host/n8n/healthz).
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    for marker in ("/webhook-test/", "/webhook/"):
+        index = path.find(marker)
+        if index != -1:
+            path = path[:index]
+            break
+    else:
+        path = ""
+    return urlunsplit((parts.scheme, parts.netloc, path.rstrip("/") + "/healthz", "", ""))
+
+
+class PinnedResolver:
+    """
+    Resolver DNS przypinający wynik rozwiązania nazwy hosta.
+    Adresy są rozwiązywane raz przy starcie i odświeżane tylko przez sondę zdrowia,
+    więc pojedyncze żądania nie czekają na DNS.
+    Implementuje interfejs aiohttp.abc.AbstractResolver.
+    """
+
+    def __init__(self):
+        from aiohttp.resolver import DefaultResolver
+        self._resolver = DefaultResolver()
+        self._pinned: Dict[Tuple[str, int, int], List[Dict[str, Any]]] = {}
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        key = (host, port, family)
+        if key not in self._pinned:
+            self._pinned[key] = await self._resolver.resolve(host, port, family)
+        return self._pinned[key]
+
+    async def refresh(self) -> None:
+        """Ponownie rozwiązuje wszystkie przypięte nazwy hostów"""
+        for host, port, family in list(self._pinned):
+            try:
+                self._pinned[(host, port, family)] = await self._resolver.resolve(host, port, family)
+            except OSError as e:
+                # Zachowaj poprzednie adresy, jeśli DNS chwilowo nie odpowiada
+                logger.warning(f"Nie udało się odświeżyć DNS dla {host}: {str(e)}")
+
+    async def close(self) -> None:
+        await self._resolver.close()
+
+
+class LatencyStats:
+    """
+    Statystyki opóźnień dla pojedynczego endpointu n8n.
+    Przechowuje ograniczoną liczbę ostatnich próbek.
+    """
+
+    def __init__(self, window: int = 200):
+        self.samples: deque = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.last_ms: Optional[float] = None
+
+    def record(self, latency_ms: float, ok: bool = True) -> None:
+        """Zapisuje wynik pojedynczego wywołania"""
+        self.count += 1
+        self.last_ms = latency_ms
+        self.samples.append(latency_ms)
+        if not ok:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Zwraca podsumowanie statystyk"""
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            index = min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))
+            return round(ordered[index], 1)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "last_ms": round(self.last_ms, 1) if self.last_ms is not None else None,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+        }
+
+
+class N8nEndpoint:
+    """
+    Nazwany endpoint n8n z własną pulą połączeń keep-alive.
+    """
+
+    def __init__(self, name: str, url: str, health_url: Optional[str] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE):
+        """
+        Inicjalizuje endpoint
+
+        Args:
+            name: Nazwa, po której klienci odwołują się do endpointu
+            url: URL webhooka n8n
+            health_url: URL sondy zdrowia (domyślnie /healthz instancji n8n)
+            pool_size: Maksymalna liczba połączeń w puli
+        """
+        self.name = name
+        self.url = url
+        self.health_url = health_url or default_health_url(url)
+        self.pool_size = pool_size
+        self.stats = LatencyStats()
+        self.healthy: Optional[bool] = None
+        self.last_check: Optional[float] = None
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self._resolver: Optional[PinnedResolver] = None
+
+    async def start(self) -> None:
+        """Tworzy pulę połączeń (pierwsza sonda rozgrzewa ją w tle)"""
+        if self.session is not None:
+            return
+        import aiohttp
+        self._resolver = PinnedResolver()
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            resolver=self._resolver,
+        )
+        self.session = aiohttp.ClientSession(connector=connector)
+
+    async def probe(self) -> Optional[bool]:
+        """
+        Sprawdza dostępność endpointu.
+        Odpowiedź poniżej 500 oznacza, że instancja n8n działa; 404 i 405 oznaczają,
+        że adres sondy nie jest obsługiwany, więc stan pozostaje nieznany (None).
+        """
+        if self.session is None:
+            return False
+        if self._resolver is not None:
+            await self._resolver.refresh()
+        import aiohttp
+        try:
+            timeout = aiohttp.ClientTimeout(total=HEALTH_TIMEOUT)
+            async with self.session.head(self.health_url, timeout=timeout) as response:
+                if response.status in (404, 405):
+                    self.healthy = None
+                    logger.warning(f"Sonda zdrowia endpointu {self.name} nie jest obsługiwana (kod {response.status})")
+                else:
+                    self.healthy = response.status < 500
+        except Exception as e:
+            logger.warning(f"Sonda zdrowia endpointu {self.name} nie powiodła się: {str(e)}")
+            self.healthy = False
+        self.last_check = time.time()
+        return self.healthy
+
+    async def close(self) -> None:
+        """Zamyka pulę połączeń"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+
+    def describe(self) -> Dict[str, Any]:
+        """Zwraca stan endpointu bez ujawniania jego URL"""
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "last_check": self.last_check,
+            "stats": self.stats.snapshot(),
+        }
+
+
+class EndpointRegistry:
+    """
+    Rejestr dozwolonych endpointów n8n konfigurowany po stronie serwera.
+    Klienci odwołują się do endpointów po nazwie, dzięki czemu aplikacja
+    nie działa jako otwarte proxy HTTP.
+    """
+
+    def __init__(self, endpoints: Optional[List[N8nEndpoint]] = None,
+                 allow_custom_urls: Optional[bool] = None):
+        """
+        Inicjalizuje rejestr
+
+        Args:
+            endpoints: Lista endpointów
+            allow_custom_urls: Czy akceptować dowolne URL od klientów
+                (domyślnie tylko, gdy rejestr jest pusty)
+        """
+        self.endpoints: Dict[str, N8nEndpoint] = {e.name: e for e in endpoints or []}
+        self.allow_custom_urls = not self.endpoints if allow_custom_urls is None else allow_custom_urls
+        self._health_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "EndpointRegistry":
+        """
+        Tworzy rejestr z konfiguracji.
+        N8N_ENDPOINTS zawiera JSON, a N8N_ENDPOINTS_FILE ścieżkę do pliku JSON
+        w formacie {"nazwa": "url"} lub {"nazwa": {"url": ..., "health_url": ..., "pool_size": ...}}.
+        """
+        config: Dict[str, Any] = {}
+        config_file = os.getenv("N8N_ENDPOINTS_FILE")
+        if config_file:
+            with open(config_file, "r", encoding="utf-8") as f:
+                config.update(json.load(f))
+        config_env = os.getenv("N8N_ENDPOINTS")
+        if config_env:
+            config.update(json.loads(config_env))
+
+        endpoints = []
+        for name, entry in config.items():
+            if isinstance(entry, str):
+                entry = {"url": entry}
+            endpoints.append(N8nEndpoint(
+                name=name,
+                url=entry["url"],
+                health_url=entry.get("health_url"),
+                pool_size=int(entry.get("pool_size", DEFAULT_POOL_SIZE)),
+            ))
+
+        allow_custom = os.getenv("ALLOW_CUSTOM_WEBHOOK_URLS")
+        allow_custom_urls = None if allow_custom is None else allow_custom.lower() in ("1", "true", "yes")
+        return cls(endpoints, allow_custom_urls=allow_custom_urls)
+
+    def get(self, name: str) -> Optional[N8nEndpoint]:
+        """Zwraca endpoint o podanej nazwie"""
+        return self.endpoints.get(name)
+
+    def find_by_url(self, url: str) -> Optional[N8nEndpoint]:
+        """Zwraca endpoint o podanym URL"""
+        for endpoint in self.endpoints.values():
+            if endpoint.url == url:
+                return endpoint
+        return None
+
+    async def start(self) -> None:
+        """
+        Tworzy pule połączeń i uruchamia sondowanie zdrowia w tle.
+        Pierwsza sonda (rozgrzewająca pule) nie wstrzymuje startu aplikacji.
+        """
+        if not self.endpoints:
+            return
+        await asyncio.gather(*(e.start() for e in self.endpoints.values()))
+        self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f"Zarejestrowano endpointy n8n: {', '.join(self.endpoints)}")
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.gather(*(e.probe() for e in self.endpoints.values()))
+            await asyncio.sleep(HEALTH_INTERVAL)
+
+    async def close(self) -> None:
+        """Zatrzymuje sondowanie i zamyka pule połączeń"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await asyncio.gather(*(e.close() for e in self.endpoints.values()))
+
+    def describe(self) -> Dict[str, Any]:
+        """Zwraca stan wszystkich endpointów"""
+        return {
+            "allow_custom_urls": self.allow_custom_urls,
+            "endpoints": [e.describe() for e in self.endpoints.values()],
+        }
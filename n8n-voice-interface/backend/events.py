@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from backend.session import SESSION_MAX
+
+# Konfiguracja loggera
+logger = logging.getLogger(__name__)
+
+# Stałe konfiguracyjne
+EVENTS_BACKLOG = int(os.getenv("EVENTS_BACKLOG", "20"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "10"))
+# Strumień jest zamykany po tym czasie, a przeglądarka łączy się ponownie (z Last-Event-ID),
+# dzięki czemu otwarte strumienie nie wstrzymują zamykania serwera
+EVENTS_STREAM_SECONDS = float(os.getenv("EVENTS_STREAM_SECONDS", "25"))
+EVENTS_RETRY_MS = 1000
+# Sesje, których strumień zamknięto w tym czasie, traktowane są jako połączone (trwa ponowne łączenie)
+EVENTS_RECENT_SECONDS = float(os.getenv("EVENTS_RECENT_SECONDS", "60"))
+
+# Zdarzenie jako krotka (identyfikator, typ, dane)
+Event = Tuple[int, str, Dict[str, Any]]
+
+
+class EventBroker:
+    """
+    Rozsyła zdarzenia (np. gotowa odpowiedź n8n, gotowe audio) do przeglądarek
+    połączonych przez Server-Sent Events, osobno dla każdej sesji.
+    Ostatnie zdarzenia sesji są przechowywane, aby po ponownym połączeniu
+    (nagłówek Last-Event-ID) klient otrzymał to, co go ominęło.
+    """
+
+    def __init__(self, backlog: int = EVENTS_BACKLOG, max_sessions: int = SESSION_MAX,
+                 queue_size: int = EVENTS_QUEUE_SIZE, recent_seconds: float = EVENTS_RECENT_SECONDS):
+        """
+        Inicjalizuje brokera zdarzeń
+
+        Args:
+            backlog: Liczba ostatnich zdarzeń przechowywanych dla sesji
+            max_sessions: Maksymalna liczba sesji z przechowywanymi zdarzeniami
+            queue_size: Maksymalna liczba zdarzeń oczekujących na wysłanie do jednego klienta
+            recent_seconds: Czas od zamknięcia strumienia, przez który sesja jest uznawana za połączoną
+        """
+        self.backlog_size = backlog
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        # Identyfikatory rosną także między uruchomieniami procesu (mikrosekundy od epoki),
+        # więc Last-Event-ID zapamiętany przed restartem nie blokuje nowych zdarzeń
+        self._last_id = time.time_ns() // 1000
+        self._backlog: "OrderedDict[str, deque]" = OrderedDict()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.recent_seconds = recent_seconds
+        # Czas zamknięcia ostatniego strumienia sesji bez aktywnych połączeń
+        self._disconnected_at: "OrderedDict[str, float]" = OrderedDict()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, session_id: str, event: str, data: Dict[str, Any]) -> int:
+        """
+        Publikuje zdarzenie dla sesji
+
+        Args:
+            session_id: Identyfikator sesji
+            event: Typ zdarzenia
+            data: Dane zdarzenia (serializowane do JSON)
+
+        Returns:
+            Identyfikator zdarzenia
+        """
+        self._last_id += 1
+        record: Event = (self._last_id, event, data)
+        backlog = self._backlog.get(session_id)
+        if backlog is None:
+            backlog = self._backlog[session_id] = deque(maxlen=self.backlog_size)
+            while len(self._backlog) > self.max_sessions:
+                self._backlog.popitem(last=False)
+        else:
+            self._backlog.move_to_end(session_id)
+        backlog.append(record)
+        self.published += 1
+        self._prune_disconnected()
+
+        for queue in self._subscribers.get(session_id, ()):
+            if queue.full():
+                # Klient nie nadąża - pomiń najstarsze oczekujące zdarzenie
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(record)
+        return record[0]
+
+    def is_connected(self, session_id: str) -> bool:
+        """
+        Sprawdza, czy sesja ma otwarty strumień lub zamknęła go niedawno (i łączy się ponownie),
+        czyli czy opublikowane zdarzenie do niej dotrze
+        """
+        if session_id in self._subscribers:
+            return True
+        disconnected_at = self._disconnected_at.get(session_id)
+        return disconnected_at is not None and time.monotonic() - disconnected_at <= self.recent_seconds
+
+    def _prune_disconnected(self) -> None:
+        """Usuwa sesje, które nie połączyły się ponownie w czasie recent_seconds"""
+        cutoff = time.monotonic() - self.recent_seconds
+        while self._disconnected_at and next(iter(self._disconnected_at.values())) < cutoff:
+            self._disconnected_at.popitem(last=False)
+
+    def connected_sessions(self) -> List[str]:
+        """Zwraca sesje z otwartym lub niedawno zamkniętym strumieniem"""
+        self._prune_disconnected()
+        return list(self._subscribers) + list(self._disconnected_at)
+
+    def broadcast(self, event: str, data: Dict[str, Any]) -> int:
+        """
+        Publikuje zdarzenie dla wszystkich połączonych sesji, także tych, które są w trakcie
+        ponownego łączenia - otrzymają je z zapisanych zdarzeń (Last-Event-ID)
+
+        Returns:
+            Liczba sesji, do których wysłano zdarzenie
+        """
+        sessions = self.connected_sessions()
+        for session_id in sessions:
+            self.publish(session_id, event, data)
+        return len(sessions)
+
+    @staticmethod
+    def format(record: Event) -> str:
+        """Formatuje zdarzenie w formacie text/event-stream"""
+        event_id, event, data = record
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def stream(self, session_id: str, last_event_id: Optional[int] = None,
+                     max_seconds: float = EVENTS_STREAM_SECONDS,
+                     keepalive: float = EVENTS_KEEPALIVE_SECONDS,
+                     is_open: Optional[Callable[[], bool]] = None) -> AsyncIterator[str]:
+        """
+        Strumień zdarzeń sesji w formacie text/event-stream
+
+        Args:
+            session_id: Identyfikator sesji
+            last_event_id: Identyfikator ostatniego odebranego zdarzenia (przy ponownym połączeniu)
+            max_seconds: Czas, po którym strumień jest zamykany
+            keepalive: Odstęp komentarzy podtrzymujących połączenie
+            is_open: Sprawdzane co sekundę; strumień jest zamykany, gdy zwróci False (np. przy zamykaniu serwera)
+
+        Yields:
+            Kolejne fragmenty strumienia
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(session_id, set()).add(queue)
+        self._disconnected_at.pop(session_id, None)
+        self._prune_disconnected()
+        try:
+            if last_event_id is None:
+                # Pierwsze połączenie - zdarzenia wcześniejsze niż subskrypcja nie są wysyłane
+                last_sent = self._last_id
+            elif last_event_id > self._last_id:
+                # Identyfikator spoza tego procesu (np. cofnięty zegar) - wyślij wszystkie zapisane zdarzenia
+                last_sent = 0
+            else:
+                last_sent = last_event_id
+            # Bieżący identyfikator w pierwszej ramce sprawia, że przeglądarka zawsze łączy się
+            # ponownie z Last-Event-ID i otrzymuje zdarzenia opublikowane między połączeniami
+            yield f"id: {last_sent}\nretry: {EVENTS_RETRY_MS}\n\n"
+
+            # Zdarzenia, które ominęły klienta między połączeniami
+            for record in list(self._backlog.get(session_id, ())):
+                if record[0] > last_sent:
+                    last_sent = record[0]
+                    yield self.format(record)
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + max_seconds
+            next_keepalive = loop.time() + keepalive
+            while is_open is None or is_open():
+                now = loop.time()
+                remaining = deadline - now
+                if remaining <= 0:
+                    break
+                if now >= next_keepalive:
+                    next_keepalive = now + keepalive
+                    yield ": keepalive\n\n"
+                timeout = min(next_keepalive - now, remaining)
+                if is_open is not None:
+                    timeout = min(timeout, 1.0)
+                try:
+                    record = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    continue
+                if record[0] > last_sent:
+                    last_sent = record[0]
+                    yield self.format(record)
+        finally:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[session_id]
+                    self._disconnected_at[session_id] = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Zwraca liczbę połączonych klientów i liczniki zdarzeń"""
+        return {
+            "connected_sessions": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "reconnecting_sessions": len(self.connected_sessions()) - len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,171 @@
+import os
+import copy
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException
+
+from backend.utils.single_flight import SingleFlight
+
+# Konfiguracja loggera
+logger = logging.getLogger(__name__)
+
+# Stałe konfiguracyjne
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "1000"))
+
+
+class IdempotencyStore(ABC):
+    """
+    Interfejs magazynu wyników dla kluczy idempotencji.
+    Implementacje dla współdzielonych magazynów (np. Redis) muszą zdefiniować wszystkie metody.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Pobiera zapisany rekord lub None, jeśli nie istnieje lub wygasł"""
+
+    @abstractmethod
+    async def set(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        """Zapisuje rekord na podany czas w sekundach"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Usuwa rekord"""
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """
+    Ograniczony magazyn w pamięci z wygasaniem wpisów.
+    Po przekroczeniu limitu usuwane są najdawniej używane wpisy.
+    """
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_MAX_KEYS):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        # Zwracaj kopie, tak jak magazyn współdzielony zwracałby zdeserializowane dane
+        return copy.deepcopy(record)
+
+    async def set(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, copy.deepcopy(record))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class IdempotencyManager:
+    """
+    Obsługa nagłówka Idempotency-Key.
+    Wynik pierwszego wykonania jest zapisywany i odtwarzany przy ponowieniach,
+    a ponowienia trwającego żądania czekają na jego wynik zamiast je powtarzać.
+    """
+
+    def __init__(self, store: Optional[IdempotencyStore] = None, ttl: float = IDEMPOTENCY_TTL):
+        """
+        Inicjalizuje menedżera
+
+        Args:
+            store: Magazyn wyników (domyślnie ograniczony magazyn w pamięci)
+            ttl: Czas przechowywania wyników w sekundach
+        """
+        self.store = store or InMemoryIdempotencyStore()
+        self.ttl = ttl
+        self.replays = 0
+        self._flight = SingleFlight("idempotency")
+        self._pending: Dict[str, str] = {}
+
+    async def run(self, key: str, fingerprint: str,
+                  func: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Wykonuje żądanie raz dla danego klucza
+
+        Args:
+            key: Klucz idempotencji (z zakresem endpointu)
+            fingerprint: Skrót treści żądania, aby wykryć ponowne użycie klucza dla innych danych
+            func: Funkcja asynchroniczna wykonująca żądanie
+
+        Returns:
+            Krotka (wynik, czy wynik został odtworzony)
+        """
+        record = await self.store.get(key)
+        if record is not None:
+            self._check_fingerprint(record["fingerprint"], fingerprint)
+            self.replays += 1
+            logger.info(f"Odtworzono wynik dla klucza idempotencji: {key}")
+            return record["result"], True
+
+        # Skrót treści jest rejestrowany od razu (bez oczekiwania), aby równoczesne
+        # ponowienie z innymi danymi otrzymało 422 zamiast wyniku tego żądania
+        pending = self._pending.get(key)
+        claimed = pending is None
+        if claimed:
+            self._pending[key] = fingerprint
+        else:
+            self._check_fingerprint(pending, fingerprint)
+
+        leader = False
+
+        async def execute() -> Dict[str, Any]:
+            nonlocal leader
+            leader = True
+            try:
+                result = await func()
+                await self.store.set(key, {"fingerprint": fingerprint, "result": result}, self.ttl)
+                return result
+            finally:
+                self._pending.pop(key, None)
+
+        try:
+            result = await self._flight.do(key, execute)
+        finally:
+            # Dołączono do kończącego się wykonania - zwolnij zarejestrowany skrót
+            if claimed and not leader:
+                self._pending.pop(key, None)
+        if not leader:
+            self.replays += 1
+        return copy.deepcopy(result), not leader
+
+    async def update_result(self, key: str, fields: Dict[str, Any]) -> None:
+        """
+        Uzupełnia zapisany wynik (np. o adres audio wygenerowany w tle)
+
+        Args:
+            key: Klucz idempotencji
+            fields: Pola do dodania do wyniku
+        """
+        record = await self.store.get(key)
+        if record is None:
+            return
+        record["result"].update(fields)
+        await self.store.set(key, record, self.ttl)
+
+    @staticmethod
+    def _check_fingerprint(stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            raise HTTPException(status_code=422, detail="Klucz idempotencji został już użyty dla innego żądania")
+
+    def stats(self) -> Dict[str, int]:
+        """Zwraca liczniki odtworzonych i trwających żądań"""
+        return {
+            "replays": self.replays,
+            "in_flight": len(self._pending)
+        }
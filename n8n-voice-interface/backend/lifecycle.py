@@ -0,0 +1,157 @@
+import os
+import time
+import asyncio
+import logging
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Coroutine, Dict, Optional, Set
+
+from fastapi import HTTPException
+
+# Konfiguracja loggera
+logger = logging.getLogger(__name__)
+
+# Stałe konfiguracyjne
+SHUTDOWN_DRAIN_TIMEOUT = int(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "30"))
+
+# Wszystkie trackery procesu - zamykanie jest rozpoczynane z obsługi sygnału serwera
+_trackers: "weakref.WeakSet[TurnTracker]" = weakref.WeakSet()
+# Wspólny termin zakończenia zamykania (time.monotonic), ustawiany po otrzymaniu sygnału
+_shutdown_deadline: Optional[float] = None
+
+
+def begin_shutdown(timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> None:
+    """
+    Rozpoczyna zamykanie procesu: wszystkie trackery przestają przyjmować nowe tury,
+    a serwer i aplikacja mają łącznie timeout sekund na dokończenie pracy.
+    Wywoływane z obsługi sygnału, zanim serwer zacznie czekać na otwarte połączenia.
+
+    Args:
+        timeout: Łączny czas na zakończenie żądań i zadań w tle
+    """
+    global _shutdown_deadline
+    if _shutdown_deadline is None:
+        _shutdown_deadline = time.monotonic() + timeout
+    for tracker in list(_trackers):
+        tracker.accepting = False
+
+
+def shutdown_remaining(timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> float:
+    """
+    Zwraca czas pozostały do wspólnego terminu zamykania
+
+    Args:
+        timeout: Czas zwracany, gdy zamykanie nie zostało rozpoczęte sygnałem
+
+    Returns:
+        Pozostały czas w sekundach (nie mniej niż 0)
+    """
+    if _shutdown_deadline is None:
+        return timeout
+    return max(0.0, _shutdown_deadline - time.monotonic())
+
+
+class TurnTracker:
+    """
+    Śledzi trwające tury rozmowy i zadania w tle (np. generowanie TTS).
+    Przy zamykaniu aplikacji przestaje przyjmować nowe tury i czeka na zakończenie trwających.
+    """
+
+    def __init__(self):
+        self.accepting = True
+        self.active_turns = 0
+        self.rejected = 0
+        self._tasks: Set[asyncio.Task] = set()
+        _trackers.add(self)
+
+    def ensure_accepting(self) -> None:
+        """
+        Sprawdza, czy aplikacja przyjmuje nowe tury
+
+        Raises:
+            HTTPException: 503, jeśli aplikacja jest zamykana
+        """
+        if not self.accepting:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Serwer jest zamykany, spróbuj ponownie",
+                headers={"Retry-After": "1", "Connection": "close"}
+            )
+
+    @asynccontextmanager
+    async def turn(self) -> AsyncIterator[None]:
+        """
+        Oznacza trwającą turę rozmowy
+
+        Raises:
+            HTTPException: 503, jeśli aplikacja jest zamykana
+        """
+        self.ensure_accepting()
+        self.active_turns += 1
+        try:
+            yield
+        finally:
+            self.active_turns -= 1
+
+    def spawn(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """
+        Uruchamia zadanie w tle, na które zamykanie aplikacji poczeka
+
+        Args:
+            coro: Korutyna do uruchomienia
+
+        Returns:
+            Utworzone zadanie
+        """
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def start_accepting(self) -> None:
+        """Zaczyna przyjmować nowe tury"""
+        self.accepting = True
+
+    def stop_accepting(self) -> None:
+        """Przestaje przyjmować nowe tury"""
+        self.accepting = False
+        logger.info("Zamykanie aplikacji: nowe tury nie są przyjmowane")
+
+    async def drain(self, timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> bool:
+        """
+        Czeka na zakończenie trwających tur i zadań w tle
+
+        Args:
+            timeout: Maksymalny czas oczekiwania w sekundach
+
+        Returns:
+            True, jeśli wszystko zakończyło się przed upływem czasu
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.active_turns or self._tasks:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(
+                    f"Upłynął czas oczekiwania na zakończenie tur "
+                    f"(trwające tury: {self.active_turns}, zadania w tle: {len(self._tasks)})"
+                )
+                for task in list(self._tasks):
+                    task.cancel()
+                return False
+            if self._tasks:
+                await asyncio.wait(list(self._tasks), timeout=min(remaining, 0.5))
+            else:
+                await asyncio.sleep(min(remaining, 0.1))
+        logger.info("Wszystkie trwające tury zostały zakończone")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Zwraca liczniki tur i zadań w tle"""
+        return {
+            "accepting": self.accepting,
+            "active_turns": self.active_turns,
+            "background_tasks": len(self._tasks),
+            "rejected": self.rejected
+        }
@@ -0,0 +1,100 @@
+"""
+Produkcyjny punkt wejścia N8N Voice Interface.
+
+Uruchomienie: python -m backend.server (z katalogu głównego projektu)
+"""
+import os
+import sys
+import logging
+import importlib.util
+from typing import Dict, Any
+
+from backend.lifecycle import SHUTDOWN_DRAIN_TIMEOUT, begin_shutdown
+
+# Konfiguracja loggera
+logger = logging.getLogger(__name__)
+
+
+def _available(module: str) -> bool:
+    """Sprawdza, czy opcjonalny moduł jest zainstalowany"""
+    return importlib.util.find_spec(module) is not None
+
+
+def build_config() -> Dict[str, Any]:
+    """
+    Buduje ustawienia uvicorn na podstawie zmiennych środowiskowych
+
+    Returns:
+        Słownik argumentów dla uvicorn.run
+    """
+    reload = os.getenv("UVICORN_RELOAD", "false").lower() in ("1", "true", "yes")
+
+    # Implementacja HTTP: httptools jest szybszy, h11 nie wymaga kompilacji
+    http = os.getenv("UVICORN_HTTP", "auto")
+    if http == "auto":
+        http = "httptools" if _available("httptools") else "h11"
+
+    # Pętla zdarzeń: uvloop, jeśli jest dostępny
+    loop = os.getenv("UVICORN_LOOP", "auto")
+    if loop == "auto":
+        loop = "uvloop" if _available("uvloop") else "asyncio"
+
+    config = {
+        "host": os.getenv("HOST", "0.0.0.0"),
+        "port": int(os.getenv("PORT", "8000")),
+        "http": http,
+        "loop": loop,
+        "reload": reload,
+        # Przeładowanie działa tylko z jednym procesem
+        "workers": 1 if reload else int(os.getenv("WEB_CONCURRENCY", "1")),
+        "timeout_keep_alive": int(os.getenv("UVICORN_TIMEOUT_KEEP_ALIVE", "5")),
+        "timeout_graceful_shutdown": SHUTDOWN_DRAIN_TIMEOUT,
+        "backlog": int(os.getenv("UVICORN_BACKLOG", "2048")),
+        "proxy_headers": True,
+        "access_log": os.getenv("UVICORN_ACCESS_LOG", "true").lower() in ("1", "true", "yes"),
+    }
+
+    limit_concurrency = os.getenv("UVICORN_LIMIT_CONCURRENCY")
+    if limit_concurrency:
+        config["limit_concurrency"] = int(limit_concurrency)
+
+    return config
+
+
+def main() -> None:
+    """Uruchamia serwer aplikacji"""
+    import uvicorn
+
+    class GracefulServer(uvicorn.Server):
+        """
+        Serwer uvicorn, który po sygnale zamknięcia od razu przestaje przyjmować nowe tury.
+        uvicorn najpierw czeka na otwarte połączenia, a dopiero potem wywołuje zamykanie
+        aplikacji (lifespan), więc wstrzymanie przyjmowania tur musi nastąpić wcześniej.
+        """
+
+        def handle_exit(self, sig, frame) -> None:
+            begin_shutdown(SHUTDOWN_DRAIN_TIMEOUT)
+            super().handle_exit(sig, frame)
+
+    config = build_config()
+    logger.info(
+        f"Uruchamianie serwera (procesy: {config['workers']}, http: {config['http']}, "
+        f"pętla: {config['loop']}, przeładowanie: {config['reload']})"
+    )
+    if config["reload"] or config["workers"] > 1:
+        # Nadzorca procesów tworzy własne serwery; zamykanie zaczyna się wtedy w lifespan
+        uvicorn.run("backend.app:app", **config)
+        return
+
+    server = GracefulServer(uvicorn.Config("backend.app:app", **config))
+    server.run()
+    if not server.started:
+        sys.exit(3)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
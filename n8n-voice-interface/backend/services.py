@@ -0,0 +1,93 @@
+import logging
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+from fastapi import HTTPException, Request
+
+from backend.session import SessionStorage
+
+if TYPE_CHECKING:
+    from backend.stt import SpeechToTextService
+    from backend.tts import TextToSpeechService
+    from backend.webhook import WebhookService
+
+# Konfiguracja loggera
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Kontener serwisów STT, TTS i webhooka tworzonych przy pierwszym użyciu.
+    Tworzony w cyklu życia aplikacji, dzięki czemu import i start serwera
+    nie wymagają klucza API ani ładowania modułów, które nie są jeszcze potrzebne.
+    """
+
+    def __init__(self, app_version: str = "1.0.0"):
+        """
+        Inicjalizuje kontener
+
+        Args:
+            app_version: Wersja aplikacji przekazywana do serwisu webhooka
+        """
+        self.app_version = app_version
+        self._stt: Optional["SpeechToTextService"] = None
+        self._tts: Optional["TextToSpeechService"] = None
+        self._webhook: Optional["WebhookService"] = None
+
+    @property
+    def stt(self) -> "SpeechToTextService":
+        """Serwis transkrypcji mowy"""
+        if self._stt is None:
+            from backend.stt import SpeechToTextService
+            self._stt = SpeechToTextService()
+        return self._stt
+
+    @property
+    def tts(self) -> "TextToSpeechService":
+        """Serwis syntezy mowy"""
+        if self._tts is None:
+            from backend.tts import TextToSpeechService
+            self._tts = TextToSpeechService()
+        return self._tts
+
+    @property
+    def webhook(self) -> "WebhookService":
+        """Serwis komunikacji z webhookami n8n"""
+        if self._webhook is None:
+            from backend.webhook import WebhookService
+            self._webhook = WebhookService(app_version=self.app_version)
+        return self._webhook
+
+    async def close(self) -> None:
+        """Zamyka współdzielone sesje HTTP utworzonych serwisów"""
+        for service in (self._tts, self._webhook):
+            if service is not None:
+                await service.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Zwraca liczniki single-flight utworzonych serwisów"""
+        return {
+            "stt": self._stt.flight.stats() if self._stt else None,
+            "tts": self._tts.flight.stats() if self._tts else None
+        }
+
+    def stt_routing_stats(self) -> Optional[Dict[str, Any]]:
+        """Zwraca opóźnienia modeli STT i ostatnie decyzje routera"""
+        return self._stt.router.stats() if self._stt else None
+
+
+# Zależności FastAPI wstrzykujące serwisy do endpointów
+def get_services(request: Request) -> ServiceContainer:
+    """Zwraca kontener serwisów aplikacji"""
+    return request.app.state.services
+
+def get_sessions(request: Request) -> SessionStorage:
+    """Zwraca magazyn sesji i historii rozmów"""
+    return request.app.state.sessions
+
+def get_tts(request: Request) -> "TextToSpeechService":
+    """Zwraca serwis TTS"""
+    try:
+        return get_services(request).tts
+    except ValueError as e:
+        # Brak klucza API zgłaszany przy pierwszym użyciu serwisu
+        raise HTTPException(status_code=500, detail=str(e))
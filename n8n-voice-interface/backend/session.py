@@ -1,43 +1,313 @@
+import os
+import json
+import asyncio
+import time
+import queue
 import logging
+import threading
 import uuid
-from typing import Dict, Any, Optional
+from collections import OrderedDict, deque
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Stałe konfiguracyjne
+SESSION_MAX = int(os.getenv("SESSION_MAX", "5000"))
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "50"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "4000"))
+HISTORY_MAX_MESSAGE_CHARS = int(os.getenv("HISTORY_MAX_MESSAGE_CHARS", "2000"))
+HISTORY_CONTEXT_MESSAGES = int(os.getenv("HISTORY_CONTEXT_MESSAGES", "10"))
+HISTORY_CONTEXT_TOKENS = int(os.getenv("HISTORY_CONTEXT_TOKENS", "1000"))
+# Dziennik historii jest przepisywany (bez wiadomości spoza limitów) po tylu dopisanych wpisach
+HISTORY_LOG_COMPACT_EVERY = int(os.getenv("HISTORY_LOG_COMPACT_EVERY", "10000"))
+
+# Wpis dziennika historii: (identyfikator sesji, rola, tekst, znacznik czasu)
+HistoryRecord = Tuple[str, str, str, float]
+
+def estimate_tokens(text: str) -> int:
+    """Przybliżona liczba tokenów (ok. 4 znaki na token)"""
+    return len(text) // 4 + 1
+
+class ConversationHistory:
+    """
+    Historia rozmowy przechowywana w buforze cyklicznym.
+    Limit liczby wiadomości i tokenów sprawia, że pamięć na sesję jest ograniczona,
+    a dodanie wiadomości ma stały koszt (zamortyzowany).
+    """
+
+    __slots__ = ("messages", "tokens", "max_tokens")
+
+    def __init__(self, max_messages: int = HISTORY_MAX_MESSAGES, max_tokens: int = HISTORY_MAX_TOKENS):
+        # Wiadomości jako krotki (rola, tekst, znacznik czasu, liczba tokenów)
+        self.messages: deque = deque(maxlen=max_messages)
+        self.tokens = 0
+        self.max_tokens = max_tokens
+
+    def append(self, role: str, text: str, timestamp: Optional[float] = None) -> None:
+        """
+        Dodaje wiadomość do historii
+
+        Args:
+            role: Rola autora ("user" lub "assistant")
+            text: Treść wiadomości (przycinana do HISTORY_MAX_MESSAGE_CHARS)
+            timestamp: Znacznik czasu (domyślnie bieżący)
+        """
+        text = text[:HISTORY_MAX_MESSAGE_CHARS]
+        tokens = estimate_tokens(text)
+
+        # Bufor o stałym rozmiarze usunie najstarszą wiadomość - odejmij jej tokeny
+        if len(self.messages) == self.messages.maxlen:
+            self.tokens -= self.messages[0][3]
+        self.messages.append((role, text, timestamp or time.time(), tokens))
+        self.tokens += tokens
+
+        # Usuń najstarsze wiadomości ponad limit tokenów (zostaw co najmniej ostatnią)
+        while self.tokens > self.max_tokens and len(self.messages) > 1:
+            self.tokens -= self.messages.popleft()[3]
+
+    def context(self, max_messages: int = HISTORY_CONTEXT_MESSAGES,
+                max_tokens: int = HISTORY_CONTEXT_TOKENS) -> List[Dict[str, Any]]:
+        """
+        Zwraca okno kontekstu: najnowsze wiadomości mieszczące się w limitach
+
+        Args:
+            max_messages: Maksymalna liczba wiadomości
+            max_tokens: Maksymalna łączna liczba tokenów
+
+        Returns:
+            Lista wiadomości w kolejności chronologicznej
+        """
+        window = []
+        budget = max_tokens
+        for role, text, timestamp, tokens in reversed(self.messages):
+            if len(window) >= max_messages or tokens > budget:
+                break
+            budget -= tokens
+            window.append({"role": role, "text": text, "timestamp": timestamp})
+        window.reverse()
+        return window
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+class HistoryLog:
+    """
+    Dziennik historii rozmów w formacie JSON Lines.
+    Pozwala odtworzyć historię po ponownym uruchomieniu aplikacji.
+    Zapis odbywa się w osobnym wątku, więc dopisanie wiadomości nie blokuje pętli zdarzeń.
+    Dziennik przechowuje tylko wiadomości mieszczące się w limitach sesji
+    (HISTORY_MAX_MESSAGES i HISTORY_MAX_TOKENS na sesję, SESSION_MAX sesji) - po wczytaniu i co
+    HISTORY_LOG_COMPACT_EVERY wpisów plik jest przepisywany bez starszych wiadomości.
+    """
+
+    def __init__(self, path: str, max_messages: int = HISTORY_MAX_MESSAGES, max_tokens: int = HISTORY_MAX_TOKENS,
+                 max_sessions: int = SESSION_MAX, compact_every: int = HISTORY_LOG_COMPACT_EVERY):
+        """
+        Inicjalizuje dziennik
+
+        Args:
+            path: Ścieżka do pliku dziennika
+            max_messages: Liczba ostatnich wiadomości sesji zachowywanych w dzienniku
+            max_tokens: Przybliżona liczba tokenów wiadomości sesji zachowywanych w dzienniku
+            max_sessions: Liczba ostatnio aktywnych sesji zachowywanych w dzienniku
+            compact_every: Liczba dopisanych wpisów, po której dziennik jest przepisywany
+        """
+        self.path = path
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.max_sessions = max_sessions
+        self.compact_every = compact_every
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Historia sesji w tych samych limitach co w SessionStorage (w kolejności aktywności)
+        # - zawartość pliku po przepisaniu
+        self._records: "OrderedDict[str, ConversationHistory]" = OrderedDict()
+        self._appended = 0
+        self._file = None
+        self._queue: "queue.Queue[Optional[HistoryRecord]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def append(self, session_id: str, role: str, text: str, timestamp: float) -> None:
+        """Zleca dopisanie wiadomości do dziennika (bez oczekiwania na zapis)"""
+        self._queue.put((session_id, role, text, timestamp))
+
+    def load(self) -> List[HistoryRecord]:
+        """
+        Wczytuje dziennik, przepisuje go bez wiadomości spoza limitów
+        i uruchamia wątek zapisu. Operacja blokująca - poza pętlą zdarzeń
+        uruchamiaj ją w wątku.
+
+        Returns:
+            Zachowane wiadomości, pogrupowane według sesji od najdawniej aktywnej
+        """
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self._remember((record["session_id"], record["role"], record["text"], record["timestamp"]))
+                    except (ValueError, KeyError):
+                        # Pomiń uszkodzony wpis (np. przerwany zapis)
+                        continue
+        records = list(self._iter_records())
+        self._rewrite()
+        self._writer = threading.Thread(target=self._write_loop, name="history-log", daemon=True)
+        self._writer.start()
+        return records
+
+    def _remember(self, record: HistoryRecord) -> None:
+        """Zapamiętuje wiadomość w granicach limitów dziennika"""
+        session_id, role, text, timestamp = record
+        history = self._records.get(session_id)
+        if history is None:
+            history = self._records[session_id] = ConversationHistory(self.max_messages, self.max_tokens)
+            while len(self._records) > self.max_sessions:
+                self._records.popitem(last=False)
+        else:
+            self._records.move_to_end(session_id)
+        history.append(role, text, timestamp)
+
+    def _iter_records(self) -> Iterator[HistoryRecord]:
+        """Zachowane wiadomości, pogrupowane według sesji od najdawniej aktywnej"""
+        for session_id, history in self._records.items():
+            for role, text, timestamp, _ in history.messages:
+                yield session_id, role, text, timestamp
+
+    @staticmethod
+    def _encode(record: HistoryRecord) -> str:
+        session_id, role, text, timestamp = record
+        return json.dumps(
+            {"session_id": session_id, "role": role, "text": text, "timestamp": timestamp},
+            ensure_ascii=False
+        ) + "\n"
+
+    def _rewrite(self) -> None:
+        """Przepisuje dziennik (atomowo) tylko z zachowanymi wiadomościami"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(self._encode(record) for record in self._iter_records())
+        if self._file is not None:
+            self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._appended = 0
+
+    def _write_loop(self) -> None:
+        """Wątek zapisu: dopisuje wiadomości z kolejki, zapis do dysku po opróżnieniu kolejki"""
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                self._remember(record)
+                self._file.write(self._encode(record))
+                self._appended += 1
+                if self._appended >= self.compact_every:
+                    self._rewrite()
+                elif self._queue.empty():
+                    self._file.flush()
+            except (OSError, ValueError) as e:
+                logger.error(f"Błąd zapisu dziennika historii {self.path}: {str(e)}")
+        self._file.close()
+
+    def close(self) -> None:
+        """Zapisuje oczekujące wiadomości i zamyka plik dziennika"""
+        if self._writer is None:
+            # Dziennik nie został wczytany - dopisz oczekujące wiadomości bez przepisywania
+            with open(self.path, "a", encoding="utf-8") as f:
+                while not self._queue.empty():
+                    f.write(self._encode(self._queue.get_nowait()))
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+
 class SessionStorage:
     """
     Klasa zarządzająca stanem sesji dla różnych użytkowników.
     Rozwiązuje problem zmiennych globalnych w aplikacji wieloużytkownikowej.
     """
-    
-    def __init__(self):
-        self.sessions: Dict[str, Dict[str, Any]] = {}
-    
+
+    def __init__(self, max_sessions: int = SESSION_MAX, history_log_path: Optional[str] = None):
+        """
+        Inicjalizuje magazyn sesji
+
+        Args:
+            max_sessions: Maksymalna liczba przechowywanych sesji (najdawniej używane są usuwane)
+            history_log_path: Opcjonalna ścieżka do dziennika historii rozmów
+        """
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_sessions = max_sessions
+        self.history_log: Optional[HistoryLog] = None
+
+        if history_log_path:
+            # Historia jest odtwarzana przez restore_history (w tle, po starcie aplikacji)
+            self.history_log = HistoryLog(history_log_path)
+
+    async def restore_history(self) -> None:
+        """
+        Odtwarza historię rozmów z dziennika. Plik jest czytany w osobnym wątku,
+        a sesje, które zdążyły powstać w tym czasie, zachowują nowe wiadomości
+        po odtworzonych.
+        """
+        if self.history_log is None:
+            return
+        records = await asyncio.to_thread(self.history_log.load)
+
+        restored: "OrderedDict[str, ConversationHistory]" = OrderedDict()
+        for session_id, role, text, timestamp in records:
+            history = restored.get(session_id)
+            if history is None:
+                history = restored[session_id] = ConversationHistory()
+            history.append(role, text, timestamp)
+
+        # Odtworzone sesje są starsze niż utworzone w trakcie odtwarzania
+        for session_id, history in reversed(restored.items()):
+            session = self.sessions.get(session_id)
+            if session is None:
+                self.sessions[session_id] = {
+                    'last_n8n_response': None,
+                    'last_tts_file_path': None,
+                    'history': history
+                }
+                self.sessions.move_to_end(session_id, last=False)
+            else:
+                for role, text, timestamp, _ in session['history'].messages:
+                    history.append(role, text, timestamp)
+                session['history'] = history
+        self.clean_old_sessions(self.max_sessions)
+        logger.info(f"Odtworzono {len(records)} wiadomości historii rozmów z: {self.history_log.path}")
+
     def get_session(self, session_id: str) -> Dict[str, Any]:
         """
         Pobiera lub tworzy sesję dla danego identyfikatora
-        
+
         Args:
             session_id: Unikalny identyfikator sesji
-            
+
         Returns:
             Słownik zawierający dane sesji
         """
         if session_id not in self.sessions:
             self.sessions[session_id] = {
                 'last_n8n_response': None,
-                'last_tts_file_path': None
+                'last_tts_file_path': None,
+                'history': ConversationHistory()
             }
             logger.info(f"Utworzono nową sesję: {session_id}")
+            self.clean_old_sessions(self.max_sessions)
+        else:
+            self.sessions.move_to_end(session_id)
         return self.sessions[session_id]
-    
+
     def get_or_create_session_id(self, current_id: Optional[str] = None) -> str:
         """
         Generuje nowe ID sesji lub zwraca istniejące
-        
+
         Args:
             current_id: Aktualne ID sesji (jeśli istnieje)
-            
+
         Returns:
             ID sesji (nowe lub istniejące)
         """
@@ -46,41 +316,65 @@ class SessionStorage:
             self.get_session(session_id)  # Inicjalizacja nowej sesji
             return session_id
         return current_id
-    
+
     def update_n8n_response(self, session_id: str, response: Dict[str, Any]) -> None:
         """Aktualizuje ostatnią odpowiedź n8n dla sesji"""
         session = self.get_session(session_id)
         session['last_n8n_response'] = response
         logger.info(f"Zaktualizowano odpowiedź n8n dla sesji: {session_id}")
-    
+
     def update_tts_file_path(self, session_id: str, file_path: str) -> None:
         """Aktualizuje ścieżkę do ostatniego pliku TTS dla sesji"""
         session = self.get_session(session_id)
         session['last_tts_file_path'] = file_path
         logger.info(f"Zaktualizowano ścieżkę pliku TTS dla sesji: {session_id}")
-    
+
     def get_n8n_response(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Pobiera ostatnią odpowiedź n8n dla sesji"""
         session = self.get_session(session_id)
         return session['last_n8n_response']
-    
+
     def get_tts_file_path(self, session_id: str) -> Optional[str]:
         """Pobiera ścieżkę do ostatniego pliku TTS dla sesji"""
         session = self.get_session(session_id)
         return session['last_tts_file_path']
-    
+
+    def append_history(self, session_id: str, role: str, text: str) -> None:
+        """
+        Dodaje wiadomość do historii rozmowy sesji (i do dziennika, jeśli jest włączony)
+
+        Args:
+            session_id: Identyfikator sesji
+            role: Rola autora ("user" lub "assistant")
+            text: Treść wiadomości
+        """
+        history = self.get_session(session_id)['history']
+        timestamp = time.time()
+        history.append(role, text, timestamp)
+        if self.history_log is not None:
+            self.history_log.append(session_id, role, text[:HISTORY_MAX_MESSAGE_CHARS], timestamp)
+
+    def get_context(self, session_id: str) -> List[Dict[str, Any]]:
+        """Pobiera okno kontekstu rozmowy do wysłania do n8n"""
+        return self.get_session(session_id)['history'].context()
+
+    def close(self) -> None:
+        """Zapisuje oczekujące wpisy i zamyka dziennik historii"""
+        if self.history_log is not None:
+            self.history_log.close()
+            self.history_log = None
+
     def clean_old_sessions(self, max_sessions: int = 1000) -> None:
         """
         Czyści stare sesje, jeśli jest ich zbyt wiele
-        
+
         Args:
             max_sessions: Maksymalna liczba sesji do przechowywania
         """
         if len(self.sessions) > max_sessions:
-            # Usuń najstarsze sesje (first in, first out)
+            # Usuń najdawniej używane sesje
             sessions_to_remove = len(self.sessions) - max_sessions
             for _ in range(sessions_to_remove):
                 if self.sessions:
-                    oldest_session = next(iter(self.sessions))
-                    del self.sessions[oldest_session]
+                    self.sessions.popitem(last=False)
             logger.info(f"Wyczyszczono {sessions_to_remove} starych sesji")
@@ -1,86 +1,225 @@
 import os
+import re
+import asyncio
 import logging
-import requests
 import tempfile
+import time
 import uuid
-from fastapi import UploadFile, HTTPException
+from typing import List, Optional
+from fastapi import HTTPException
+
+from backend.stt_router import SttRouter
+from backend.utils.audio import estimate_duration, split_audio
+from backend.utils.single_flight import SingleFlight
 
 # Konfiguracja loggera
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Stałe konfiguracyjne
-STT_MODEL = os.getenv("STT_MODEL", "whisper-1")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 API_URL = "https://api.openai.com/v1/audio/transcriptions"
+# Nagrania dłuższe niż próg (w sekundach) są dzielone na fragmenty transkrybowane równolegle; 0 wyłącza
+CHUNK_THRESHOLD_S = float(os.getenv("STT_CHUNK_THRESHOLD_S", "60"))
+CHUNK_CONCURRENCY = int(os.getenv("STT_CHUNK_CONCURRENCY", "4"))
+STITCH_MAX_OVERLAP_WORDS = 8
+STITCH_MIN_OVERLAP_WORDS = 2
 
-async def transcribe_audio(audio_file: UploadFile) -> dict:
+def stitch_transcripts(texts: List[str], overlapped: Optional[List[bool]] = None,
+                       max_overlap_words: int = STITCH_MAX_OVERLAP_WORDS,
+                       min_overlap_words: int = STITCH_MIN_OVERLAP_WORDS) -> str:
     """
-    Transkrybuje dźwięk używając API OpenAI.
-    
+    Łączy transkrypcje kolejnych fragmentów, usuwając słowa powtórzone na zakładce.
+    Powtórzenia są usuwane tylko na granicach, na których fragmenty zachodzą na siebie,
+    i tylko gdy pokrywa się co najmniej min_overlap_words słów - pojedyncze krótkie słowa
+    (np. "to", "i", "nie") często powtarzają się naturalnie.
+
     Args:
-        audio_file: Przesłany plik dźwiękowy
-        
+        texts: Transkrypcje fragmentów w kolejności
+        overlapped: Dla każdego fragmentu, czy zachodzi na poprzedni (domyślnie żaden)
+        max_overlap_words: Maksymalna liczba słów szukanych na styku fragmentów
+        min_overlap_words: Minimalna liczba pokrywających się słów
+
     Returns:
-        Słownik zawierający transkrypcję tekstową
+        Połączony tekst
+    """
+    def normalize(words: List[str]) -> List[str]:
+        return [re.sub(r"[^\w]", "", word.lower()) for word in words]
+
+    result: List[str] = []
+    for index, text in enumerate(texts):
+        words = text.split()
+        if result and words and overlapped and overlapped[index]:
+            tail = normalize(result[-max_overlap_words:])
+            head = normalize(words[:max_overlap_words])
+            for size in range(min(len(tail), len(head)), min_overlap_words - 1, -1):
+                if tail[-size:] == head[:size]:
+                    words = words[size:]
+                    break
+        result.extend(words)
+    return " ".join(result)
+
+class SpeechToTextService:
+    """
+    Serwis do transkrypcji mowy przy użyciu API OpenAI.
+    Równoczesne żądania z tym samym nagraniem współdzielą jedno wywołanie API,
+    a model dla każdego nagrania wybiera router (SttRouter).
+    Długie nagrania są dzielone w miejscach ciszy i transkrybowane równolegle.
     """
-    # Sprawdź klucz API
-    if not OPENAI_API_KEY:
-        logger.error("Brak klucza API OpenAI w zmiennych środowiskowych")
-        raise HTTPException(status_code=500, detail="Brak klucza API OpenAI (OPENAI_API_KEY)")
-    
-    # Zapisz plik tymczasowo
-    temp_dir = tempfile.gettempdir()
-    temp_file_path = os.path.join(temp_dir, f"audio_{uuid.uuid4()}.webm")
-    
-    try:
-        # Zapisz przesłany plik
-        with open(temp_file_path, "wb") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-        
-        logger.info(f"Zapisano plik audio do: {temp_file_path}")
-        
-        # Konfiguracja żądania API
-        headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
-        
-        with open(temp_file_path, "rb") as audio:
-            files = {
-                "file": ("audio.webm", audio, "audio/webm"),
-                "model": (None, STT_MODEL),
-                "language": (None, "pl")
-            }
-            
-            # Wyślij żądanie do API OpenAI
-            logger.info(f"Wysyłanie żądania do API OpenAI (model: {STT_MODEL})")
-            response = requests.post(API_URL, headers=headers, files=files)
-        
-        # Usuń plik tymczasowy
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, language: str = "pl",
+                 router: Optional[SttRouter] = None):
+        """
+        Inicjalizuje serwis STT
+
+        Args:
+            api_key: Klucz API OpenAI (domyślnie z zmiennej środowiskowej)
+            model: Model STT do użycia (domyślnie z zmiennej środowiskowej lub "whisper-1")
+            language: Język nagrań (domyślnie "pl" - polski)
+            router: Router wybierający model (domyślnie z konfiguracji STT_MODELS)
+        """
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.model = model or os.getenv("STT_MODEL", "whisper-1")
+        self.language = language
+        self.api_url = API_URL
+        self.flight = SingleFlight("stt")
+        self.router = router or SttRouter.from_env(default_model=self.model)
+        self.chunk_threshold = CHUNK_THRESHOLD_S
+        self.chunk_concurrency = CHUNK_CONCURRENCY
+        logger.info(f"Serwis STT zainicjowany z modelami: {', '.join(self.router.models)}, język: {self.language}")
+
+    async def transcribe(self, content: bytes) -> dict:
+        """
+        Transkrybuje nagranie przekazane jako bajty.
+
+        Args:
+            content: Zawartość pliku dźwiękowego
+
+        Returns:
+            Słownik zawierający transkrypcję tekstową
+        """
+        # Sprawdź klucz API
+        if not self.api_key:
+            logger.error("Brak klucza API OpenAI w zmiennych środowiskowych")
+            raise HTTPException(status_code=500, detail="Brak klucza API OpenAI (OPENAI_API_KEY)")
+
+        # Klucz zależy tylko od nagrania; model jest wybierany raz, wewnątrz wspólnego wywołania
+        key = SingleFlight.make_key(content)
+        duration = estimate_duration(content)
+        if self.chunk_threshold and duration > self.chunk_threshold:
+            return await self.flight.do(key, lambda: self._transcribe_chunked(content))
+        return await self.flight.do(key, lambda: self._transcribe_routed(content, self.router.choose(duration)))
+
+    async def _transcribe_chunked(self, content: bytes) -> dict:
+        """
+        Dzieli długie nagranie na fragmenty, transkrybuje je równolegle
+        (najwyżej chunk_concurrency naraz) i łączy teksty w kolejności.
+        """
         try:
-            os.remove(temp_file_path)
-            logger.info(f"Usunięto plik tymczasowy: {temp_file_path}")
+            # Dekodowanie i analiza energii w osobnym wątku, aby nie blokować pętli zdarzeń
+            chunks = await asyncio.to_thread(split_audio, content)
         except Exception as e:
-            logger.warning(f"Nie można usunąć pliku tymczasowego: {e}")
-        
-        # Sprawdź odpowiedź
-        if response.status_code != 200:
-            logger.error(f"Błąd API OpenAI ({response.status_code}): {response.text}")
-            raise HTTPException(status_code=500, detail=f"Błąd API OpenAI: {response.text}")
-        
-        # Zwróć wynik
-        result = response.json()
-        logger.info(f"Transkrypcja zakończona pomyślnie: {result.get('text', '')[:50]}...")
-        return result
-        
-    except Exception as e:
-        # Usuń plik tymczasowy w przypadku błędu
+            logger.warning(f"Nie można podzielić nagrania, wysyłanie w całości: {str(e)}")
+            chunks = []
+
+        if len(chunks) <= 1:
+            decision = self.router.choose(chunks[0][1] if chunks else estimate_duration(content))
+            return await self._transcribe_routed(content, decision)
+
+        semaphore = asyncio.Semaphore(max(1, self.chunk_concurrency))
+
+        async def transcribe_chunk(chunk: bytes, duration: float) -> dict:
+            async with semaphore:
+                decision = self.router.choose(duration)
+                return await self._transcribe_routed(chunk, decision, "audio.wav", "audio/wav")
+
+        tasks = [asyncio.ensure_future(transcribe_chunk(chunk, duration)) for chunk, duration, _ in chunks]
         try:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-        except:
-            pass
-        
-        logger.error(f"Wystąpił błąd podczas transkrypcji: {str(e)}")
-        if isinstance(e, HTTPException):
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # Błąd jednego fragmentu przerywa transkrypcję - anuluj pozostałe
+            for task in tasks:
+                task.cancel()
             raise
-        raise HTTPException(status_code=500, detail=f"Błąd transkrypcji: {str(e)}")
+
+        text = stitch_transcripts(
+            [result.get("text", "") for result in results],
+            [overlaps_previous for _, _, overlaps_previous in chunks]
+        )
+        logger.info(f"Transkrypcja {len(chunks)} fragmentów zakończona: {text[:50]}...")
+        return {"text": text, "chunks": len(chunks)}
+
+    async def _transcribe_routed(self, content: bytes, decision: dict,
+                                 filename: str = "audio.webm", content_type: str = "audio/webm") -> dict:
+        """
+        Transkrybuje nagranie wybranym modelem i zapisuje zmierzone opóźnienie w routerze.
+        """
+        start = time.perf_counter()
+        success = False
+        try:
+            result = await self._transcribe(content, decision["model"], filename, content_type)
+            success = True
+            return result
+        finally:
+            self.router.record(decision, (time.perf_counter() - start) * 1000, success)
+
+    async def _transcribe(self, content: bytes, model: str,
+                          filename: str = "audio.webm", content_type: str = "audio/webm") -> dict:
+        """
+        Wysyła nagranie do API OpenAI.
+        """
+        # Import odroczony do pierwszej transkrypcji, aby przyspieszyć start aplikacji
+        import requests
+
+        # Zapisz plik tymczasowo
+        temp_dir = tempfile.gettempdir()
+        temp_file_path = os.path.join(temp_dir, f"audio_{uuid.uuid4()}{os.path.splitext(filename)[1]}")
+
+        try:
+            # Zapisz przesłany plik
+            with open(temp_file_path, "wb") as temp_file:
+                temp_file.write(content)
+
+            logger.info(f"Zapisano plik audio do: {temp_file_path}")
+
+            # Konfiguracja żądania API
+            headers = {"Authorization": f"Bearer {self.api_key}"}
+
+            with open(temp_file_path, "rb") as audio:
+                files = {
+                    "file": (filename, audio, content_type),
+                    "model": (None, model),
+                    "language": (None, self.language)
+                }
+
+                # Wyślij żądanie do API OpenAI w osobnym wątku, aby nie blokować pętli zdarzeń
+                logger.info(f"Wysyłanie żądania do API OpenAI (model: {model})")
+                response = await asyncio.to_thread(requests.post, self.api_url, headers=headers, files=files)
+
+            # Usuń plik tymczasowy
+            try:
+                os.remove(temp_file_path)
+                logger.info(f"Usunięto plik tymczasowy: {temp_file_path}")
+            except Exception as e:
+                logger.warning(f"Nie można usunąć pliku tymczasowego: {e}")
+
+            # Sprawdź odpowiedź
+            if response.status_code != 200:
+                logger.error(f"Błąd API OpenAI ({response.status_code}): {response.text}")
+                raise HTTPException(status_code=500, detail=f"Błąd API OpenAI: {response.text}")
+
+            # Zwróć wynik
+            result = response.json()
+            logger.info(f"Transkrypcja zakończona pomyślnie: {result.get('text', '')[:50]}...")
+            return result
+
+        except Exception as e:
+            # Usuń plik tymczasowy w przypadku błędu
+            try:
+                if os.path.exists(temp_file_path):
+                    os.remove(temp_file_path)
+            except:
+                pass
+
+            logger.error(f"Wystąpił błąd podczas transkrypcji: {str(e)}")
+            if isinstance(e, HTTPException):
+                raise
+            raise HTTPException(status_code=500, detail=f"Błąd transkrypcji: {str(e)}")
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Konfiguracja loggera
+logger = logging.getLogger(__name__)
+
+# Stałe konfiguracyjne
+LATENCY_BUDGET_MS = float(os.getenv("STT_LATENCY_BUDGET_MS", "4000"))
+DURATION_BUCKETS = [float(x) for x in os.getenv("STT_DURATION_BUCKETS", "5,30").split(",") if x.strip()]
+EWMA_ALPHA = 0.3
+# Co tyle decyzji z pominięciem bardziej preferowanego modelu wysyłane jest do niego jedno nagranie próbne
+REPROBE_EVERY = int(os.getenv("STT_REPROBE_EVERY", "20"))
+
+
+class SttRouter:
+    """
+    Wybiera model STT dla nagrania na podstawie jego długości, ostatnio obserwowanych
+    opóźnień poszczególnych modeli i budżetu opóźnienia.
+
+    Modele są podane w kolejności preferencji (jakości). Wybierany jest pierwszy model,
+    którego przewidywane opóźnienie dla nagrań o podobnej długości mieści się w budżecie;
+    jeśli żaden się nie mieści - model o najniższym przewidywanym opóźnieniu.
+    Model bez pomiarów dla danej długości jest traktowany jako mieszczący się w budżecie,
+    aby zebrać pierwsze pomiary. Pominięte modele są co reprobe_every decyzji sprawdzane
+    ponownie, a wynik próby zastępuje ich nieaktualną średnią.
+    """
+
+    def __init__(self, models: List[str], latency_budget_ms: float = LATENCY_BUDGET_MS,
+                 duration_buckets: Optional[List[float]] = None,
+                 costs_per_minute: Optional[Dict[str, float]] = None,
+                 history_size: int = 200, reprobe_every: int = REPROBE_EVERY):
+        """
+        Inicjalizuje router
+
+        Args:
+            models: Modele w kolejności preferencji
+            latency_budget_ms: Budżet opóźnienia transkrypcji w milisekundach
+            duration_buckets: Progi długości nagrań w sekundach (np. [5, 30])
+            costs_per_minute: Opcjonalny koszt minuty nagrania dla każdego modelu
+            history_size: Liczba zapamiętywanych ostatnich decyzji
+            reprobe_every: Liczba decyzji z pominięciem preferowanego modelu, po której
+                jest on sprawdzany ponownie (0 wyłącza)
+        """
+        if not models:
+            raise ValueError("Lista modeli STT nie może być pusta")
+        self.models = models
+        self.latency_budget_ms = latency_budget_ms
+        self.duration_buckets = sorted(DURATION_BUCKETS if duration_buckets is None else duration_buckets)
+        self.costs_per_minute = costs_per_minute or {}
+        self.decisions: deque = deque(maxlen=history_size)
+        # Średnia krocząca opóźnienia dla par (model, przedział długości)
+        self._latency: Dict[str, Dict[str, float]] = {model: {} for model in models}
+        self._counts: Dict[str, Dict[str, int]] = {model: {"calls": 0, "errors": 0} for model in models}
+        self.reprobe_every = reprobe_every
+        # Liczba decyzji z pominięciem preferowanego modelu od ostatniej próby (dla przedziału długości)
+        self._skipped: Dict[str, int] = {}
+        # Numer ostatniego pomiaru dla par (model, przedział długości)
+        self._measured_at: Dict[str, Dict[str, int]] = {model: {} for model in models}
+        self._measurements = 0
+
+    @classmethod
+    def from_env(cls, default_model: str) -> "SttRouter":
+        """
+        Tworzy router z konfiguracji.
+        STT_MODELS zawiera modele w kolejności preferencji (oddzielone przecinkami),
+        STT_MODEL_COSTS opcjonalny JSON z kosztem minuty nagrania dla modeli.
+        """
+        models = [m.strip() for m in os.getenv("STT_MODELS", "").split(",") if m.strip()] or [default_model]
+        costs = os.getenv("STT_MODEL_COSTS")
+        return cls(models, costs_per_minute=json.loads(costs) if costs else None)
+
+    def _bucket(self, duration: float) -> str:
+        """Zwraca nazwę przedziału długości nagrania"""
+        lower = 0.0
+        for upper in self.duration_buckets:
+            if duration < upper:
+                return f"{lower:g}-{upper:g}s"
+            lower = upper
+        return f">={lower:g}s"
+
+    def predict(self, model: str, duration: float) -> Optional[float]:
+        """Zwraca przewidywane opóźnienie modelu w ms lub None, jeśli brak pomiarów"""
+        return self._latency.get(model, {}).get(self._bucket(duration))
+
+    def choose(self, duration: float) -> Dict[str, Any]:
+        """
+        Wybiera model dla nagrania
+
+        Args:
+            duration: (Szacowana) długość nagrania w sekundach
+
+        Returns:
+            Decyzja routingu (model, przewidywane opóźnienie, powód)
+        """
+        bucket = self._bucket(duration)
+        predictions = {model: self.predict(model, duration) for model in self.models}
+
+        chosen, reason = None, None
+        for model in self.models:
+            predicted = predictions[model]
+            if predicted is None:
+                chosen, reason = model, "no_data"
+                break
+            if predicted <= self.latency_budget_ms:
+                chosen, reason = model, "within_budget"
+                break
+        if chosen is None:
+            chosen = min(self.models, key=lambda model: predictions[model])
+            reason = "fastest_over_budget"
+
+        # Co reprobe_every decyzji sprawdź ponownie najdawniej mierzony pominięty model
+        skipped = self.models[:self.models.index(chosen)]
+        if skipped and reason != "no_data" and self.reprobe_every > 0:
+            self._skipped[bucket] = self._skipped.get(bucket, 0) + 1
+            if self._skipped[bucket] >= self.reprobe_every:
+                self._skipped[bucket] = 0
+                measured_at = self._measured_at
+                chosen = min(skipped, key=lambda model: measured_at.get(model, {}).get(bucket, 0))
+                reason = "reprobe"
+
+        if len(self.models) > 1:
+            logger.info(f"Routing STT: {chosen} (nagranie ~{duration:.1f}s, powód: {reason})")
+
+        return {
+            "model": chosen,
+            "duration_s": round(duration, 2),
+            "bucket": bucket,
+            "predicted_ms": round(predictions[chosen], 1) if predictions[chosen] is not None else None,
+            "budget_ms": self.latency_budget_ms,
+            "reason": reason,
+            "estimated_cost": self._cost(chosen, duration),
+            "timestamp": time.time()
+        }
+
+    def _cost(self, model: str, duration: float) -> Optional[float]:
+        cost_per_minute = self.costs_per_minute.get(model)
+        return round(cost_per_minute * duration / 60, 6) if cost_per_minute is not None else None
+
+    def record(self, decision: Dict[str, Any], latency_ms: float, success: bool) -> None:
+        """
+        Zapisuje wynik transkrypcji dla podjętej decyzji
+
+        Args:
+            decision: Decyzja zwrócona przez choose
+            latency_ms: Zmierzone opóźnienie w milisekundach
+            success: Czy transkrypcja się powiodła
+        """
+        model = decision["model"]
+        counts = self._counts.setdefault(model, {"calls": 0, "errors": 0})
+        counts["calls"] += 1
+        observed = latency_ms
+        if not success:
+            counts["errors"] += 1
+            # Błąd liczony jest jako przekroczenie budżetu, aby zawodny model był omijany
+            observed = max(latency_ms, self.latency_budget_ms * 2)
+        latencies = self._latency.setdefault(model, {})
+        previous = latencies.get(decision["bucket"])
+        if previous is None or decision["reason"] == "reprobe":
+            # Próba zastępuje nieaktualną średnią modelu, który długo nie był wybierany
+            latencies[decision["bucket"]] = observed
+        else:
+            latencies[decision["bucket"]] = EWMA_ALPHA * observed + (1 - EWMA_ALPHA) * previous
+        self._measurements += 1
+        self._measured_at.setdefault(model, {})[decision["bucket"]] = self._measurements
+        self.decisions.append({**decision, "latency_ms": round(latency_ms, 1), "success": success})
+
+    def stats(self, recent: int = 20) -> Dict[str, Any]:
+        """Zwraca średnie opóźnienia modeli i ostatnie decyzje"""
+        return {
+            "budget_ms": self.latency_budget_ms,
+            "models": {
+                model: {
+                    **self._counts.get(model, {}),
+                    "latency_ms": {bucket: round(value, 1) for bucket, value in self._latency.get(model, {}).items()}
+                }
+                for model in self.models
+            },
+            "recent_decisions": list(self.decisions)[-recent:]
+        }
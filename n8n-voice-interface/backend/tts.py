@@ -1,9 +1,9 @@
 import os
 import logging
-import aiohttp
 from typing import Dict, Any, Optional
 
 from backend.utils.file_manager import FileManager
+from backend.utils.single_flight import SingleFlight
 
 # Konfiguracja loggera
 logger = logging.getLogger(__name__)
@@ -38,6 +38,8 @@ class TextToSpeechService:
         self.language = language
         self.instructions = instructions or "Mów po polsku z polskim akcentem. Speak in Polish language with a natural Polish accent."
         self.api_url = "https://api.openai.com/v1/audio/speech"
+        self.flight = SingleFlight("tts")
+        self._session = None
         
         if not self.api_key:
             logger.error("Nie znaleziono klucza API OpenAI w zmiennych środowiskowych")
@@ -61,6 +63,18 @@ class TextToSpeechService:
         if not text:
             raise ValueError("Tekst do konwersji nie może być pusty")
         
+        # Równoczesne żądania dla tego samego tekstu i głosu współdzielą jedną syntezę
+        voice, instructions = self.voice, self.instructions
+        key = SingleFlight.make_key(self.model, voice, instructions, text)
+        return await self.flight.do(key, lambda: self._synthesize(text, voice, instructions))
+    
+    async def _synthesize(self, text: str, voice: str, instructions: str) -> str:
+        """
+        Wysyła żądanie syntezy mowy do API OpenAI i zapisuje wynik do pliku
+        """
+        # Import odroczony do pierwszej syntezy, aby przyspieszyć start aplikacji
+        import aiohttp
+        
         try:
             # Przygotuj nagłówki i dane
             headers = {
@@ -70,29 +84,31 @@ class TextToSpeechService:
             
             payload = {
                 "model": self.model,
-                "voice": self.voice,
+                "voice": voice,
                 "input": text,
-                "instructions": self.instructions,
+                "instructions": instructions,
             }
             
-            # Użyj aiohttp zamiast synchronicznego requests
-            async with aiohttp.ClientSession() as session:
-                logger.info(f"Wysyłanie żądania do API OpenAI TTS (model: {self.model}, głos: {self.voice})")
-                async with session.post(self.api_url, headers=headers, json=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Błąd API OpenAI TTS: {response.status} - {error_text}")
-                        raise Exception(f"Konwersja TTS nie powiodła się: {error_text}")
-                    
-                    # Pobierz zawartość binarną
-                    audio_content = await response.read()
-                    
-                    # Zapisz do pliku tymczasowego
-                    output_file = await FileManager.save_bytes_to_temp_file(
-                        audio_content,
-                        prefix="tts",
-                        suffix=".mp3"
-                    )
+            # Użyj współdzielonej sesji aiohttp, aby korzystać z połączeń keep-alive
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession()
+            session = self._session
+            logger.info(f"Wysyłanie żądania do API OpenAI TTS (model: {self.model}, głos: {voice})")
+            async with session.post(self.api_url, headers=headers, json=payload) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Błąd API OpenAI TTS: {response.status} - {error_text}")
+                    raise Exception(f"Konwersja TTS nie powiodła się: {error_text}")
+                
+                # Pobierz zawartość binarną
+                audio_content = await response.read()
+                
+                # Zapisz do pliku tymczasowego
+                output_file = await FileManager.save_bytes_to_temp_file(
+                    audio_content,
+                    prefix="tts",
+                    suffix=".mp3"
+                )
                     
             logger.info(f"Konwersja TTS zakończona pomyślnie: {output_file}")
             return output_file
@@ -101,6 +117,14 @@ class TextToSpeechService:
             logger.error(f"Błąd podczas konwersji tekstu na mowę: {str(e)}", exc_info=True)
             raise Exception(f"Błąd TTS: {str(e)}")
     
+    async def close(self) -> None:
+        """
+        Zamyka współdzieloną sesję HTTP
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
     async def get_tts_with_config(self, text: str, voice: Optional[str] = None, 
                                 language: Optional[str] = None, 
                                 instructions: Optional[str] = None) -> str:
@@ -131,13 +155,3 @@ class TextToSpeechService:
             # Przywróć oryginalną konfigurację
             self.voice = original_voice
             self.instructions = original_instructions
-
-# Utwórz instancję serwisu dla łatwego importu
-tts_service = TextToSpeechService()
-
-# Funkcja kompatybilności wstecznej
-async def text_to_speech(text: str) -> str:
-    """
-    Kompatybilność wsteczna z poprzednią wersją funkcji
-    """
-    return await tts_service.text_to_speech(text)
@@ -0,0 +1,197 @@
+import io
+import os
+import struct
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Przepływność nagrań bez czytelnego nagłówka (webm/opus z przeglądarki) w kb/s;
+# frontend nagrywa z audioBitsPerSecond = 128000
+ASSUMED_BITRATE_KBPS = float(os.getenv("STT_ASSUMED_BITRATE_KBPS", "128"))
+
+# Parametry dzielenia długich nagrań
+CHUNK_SECONDS = float(os.getenv("STT_CHUNK_SECONDS", "30"))
+CHUNK_OVERLAP_MS = int(os.getenv("STT_CHUNK_OVERLAP_MS", "500"))
+SILENCE_THRESHOLD_DB = float(os.getenv("STT_SILENCE_THRESHOLD_DB", "-35"))
+CHUNK_SAMPLE_RATE = 16000
+FRAME_MS = 20
+MIN_SILENCE_MS = 300
+
+def estimate_duration(content: bytes, bitrate_kbps: float = ASSUMED_BITRATE_KBPS) -> float:
+    """
+    Szacuje długość nagrania bez dekodowania audio: z nagłówka WAV lub ramki MP3,
+    a dla pozostałych formatów z rozmiaru pliku i zakładanej przepływności
+
+    Args:
+        content: Zawartość pliku dźwiękowego
+        bitrate_kbps: Zakładana przepływność nagrania w kb/s (gdy nagłówek nie określa długości)
+
+    Returns:
+        Szacowana długość nagrania w sekundach
+    """
+    duration = wav_duration(content)
+    # MP3 zaczyna się znacznikiem ID3 lub od razu synchronizacją ramki (11 bitów jedynek)
+    is_mp3 = content[:3] == b"ID3" or (len(content) > 1 and content[0] == 0xFF and content[1] & 0xE0 == 0xE0)
+    if duration is None and is_mp3:
+        duration = _mp3_frame_duration(content[:16384], len(content))
+    if duration is not None:
+        return duration
+    return len(content) * 8 / (bitrate_kbps * 1000)
+
+def wav_duration(content: bytes) -> Optional[float]:
+    """
+    Odczytuje długość nagrania WAV z nagłówka (bloki "fmt " i "data")
+
+    Returns:
+        Długość w sekundach lub None, jeśli to nie jest poprawny plik WAV
+    """
+    if content[:4] != b"RIFF" or content[8:12] != b"WAVE":
+        return None
+    byte_rate = None
+    offset = 12
+    while offset + 8 <= len(content):
+        chunk_id = content[offset:offset + 4]
+        chunk_size = struct.unpack("<I", content[offset + 4:offset + 8])[0]
+        if chunk_id == b"fmt " and offset + 16 <= len(content):
+            byte_rate = struct.unpack("<I", content[offset + 16:offset + 20])[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Nagrywanie strumieniowe może zostawić rozmiar 0 lub 0xFFFFFFFF
+            available = len(content) - offset - 8
+            if chunk_size == 0 or chunk_size > available:
+                chunk_size = available
+            return round(chunk_size / byte_rate, 2)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+def find_split_points(samples, sample_rate: int, chunk_seconds: float = CHUNK_SECONDS,
+                      silence_threshold_db: float = SILENCE_THRESHOLD_DB) -> List[Tuple[int, bool]]:
+    """
+    Wyznacza miejsca podziału nagrania na fragmenty o długości około chunk_seconds.
+    Energia (RMS) jest liczona wektorowo dla ramek 20 ms i wygładzana oknem 300 ms;
+    w pobliżu każdej docelowej granicy wybierana jest najbliższa cicha ramka,
+    a jeśli ciszy brak - ramka o najniższej energii.
+
+    Args:
+        samples: Próbki mono (tablica numpy)
+        sample_rate: Częstotliwość próbkowania
+        chunk_seconds: Docelowa długość fragmentu w sekundach
+        silence_threshold_db: Próg ciszy względem najgłośniejszej ramki (dB)
+
+    Returns:
+        Lista par (indeks próbki podziału, czy podział wypada w ciszy)
+    """
+    import numpy as np
+
+    frame = int(sample_rate * FRAME_MS / 1000)
+    n_frames = len(samples) // frame
+    chunk_frames = int(chunk_seconds * 1000 / FRAME_MS)
+    if n_frames <= chunk_frames:
+        return []
+
+    frames = samples[:n_frames * frame].astype(np.float32).reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    window = max(1, MIN_SILENCE_MS // FRAME_MS)
+    energy = np.convolve(rms, np.ones(window) / window, mode="same")
+    threshold = energy.max() * 10 ** (silence_threshold_db / 20)
+
+    # Szukaj ciszy w ostatniej ćwiartce każdego fragmentu i tuż za nią
+    search = max(1, chunk_frames // 4)
+    points = []
+    start = 0
+    while n_frames - start > chunk_frames + search:
+        target = start + chunk_frames
+        lo, hi = target - search, min(target + search // 2, n_frames)
+        window_energy = energy[lo:hi]
+        quiet = np.flatnonzero(window_energy <= threshold)
+        if quiet.size:
+            # Cicha ramka najbliżej docelowej granicy
+            split = lo + int(quiet[np.argmin(np.abs(quiet - (target - lo)))])
+        else:
+            split = lo + int(np.argmin(window_energy))
+        points.append((split * frame, bool(energy[split] <= threshold)))
+        start = split
+    return points
+
+def split_audio(content: bytes, chunk_seconds: float = CHUNK_SECONDS,
+                overlap_ms: int = CHUNK_OVERLAP_MS) -> List[Tuple[bytes, float, bool]]:
+    """
+    Dekoduje nagranie i dzieli je w miejscach ciszy na fragmenty WAV (mono, 16 kHz).
+    Gdy w pobliżu granicy nie ma ciszy, sąsiednie fragmenty zachodzą na siebie o overlap_ms,
+    aby słowo na granicy nie zostało ucięte.
+
+    Args:
+        content: Zawartość pliku dźwiękowego
+        chunk_seconds: Docelowa długość fragmentu w sekundach
+        overlap_ms: Zakładka fragmentów przy podziale poza ciszą
+
+    Returns:
+        Lista trójek (fragment WAV, długość w sekundach, czy zachodzi na poprzedni fragment);
+        jeden element, jeśli nagranie jest krótkie
+    """
+    # Importy odroczone - dekodowanie jest potrzebne tylko dla długich nagrań
+    import numpy as np
+    from pydub import AudioSegment
+
+    # WAV jest dekodowany bezpośrednio, pozostałe formaty przez ffmpeg
+    is_wav = content[:4] == b"RIFF" and content[8:12] == b"WAVE"
+    audio = AudioSegment.from_file(io.BytesIO(content), format="wav" if is_wav else None)
+    audio = audio.set_channels(1).set_frame_rate(CHUNK_SAMPLE_RATE)
+    samples = np.array(audio.get_array_of_samples())
+    points = find_split_points(samples, CHUNK_SAMPLE_RATE, chunk_seconds)
+
+    bounds = [0] + [sample * 1000 // CHUNK_SAMPLE_RATE for sample, _ in points] + [len(audio)]
+    silent = [True] + [is_silent for _, is_silent in points] + [True]
+    chunks = []
+    for i in range(len(bounds) - 1):
+        start = bounds[i] if silent[i] else max(0, bounds[i] - overlap_ms)
+        end = bounds[i + 1] if silent[i + 1] else min(len(audio), bounds[i + 1] + overlap_ms)
+        buffer = io.BytesIO()
+        audio[start:end].export(buffer, format="wav")
+        chunks.append((buffer.getvalue(), (end - start) / 1000, not silent[i]))
+
+    logger.info(f"Podzielono nagranie ({len(audio) / 1000:.1f}s) na {len(chunks)} fragmentów")
+    return chunks
+
+# Przepływności ramek MPEG Layer III (kb/s) dla MPEG-1 oraz MPEG-2/2.5
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+def mp3_duration(path: str) -> Optional[float]:
+    """
+    Szacuje długość pliku MP3 (o stałej przepływności) na podstawie nagłówka pierwszej ramki
+
+    Args:
+        path: Ścieżka do pliku MP3
+
+    Returns:
+        Długość w sekundach lub None, jeśli nie rozpoznano nagłówka
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            head = f.read(16384)
+    except OSError:
+        return None
+    return _mp3_frame_duration(head, size)
+
+def _mp3_frame_duration(head: bytes, size: int) -> Optional[float]:
+    """Szacuje długość MP3 o rozmiarze size z nagłówka pierwszej ramki w początku pliku (head)"""
+    offset = 0
+    # Pomiń znacznik ID3v2
+    if head[:3] == b"ID3" and len(head) >= 10:
+        offset = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+    for i in range(offset, len(head) - 3):
+        if head[i] == 0xFF and head[i + 1] & 0xE0 == 0xE0:
+            version = (head[i + 1] >> 3) & 0x03  # 3 = MPEG-1
+            layer = (head[i + 1] >> 1) & 0x03  # 1 = Layer III
+            bitrate_index = head[i + 2] >> 4
+            if layer != 1 or version == 1 or not 0 < bitrate_index < 15:
+                continue
+            bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index]
+            return round((size - i) * 8 / (bitrate * 1000), 2)
+    return None
@@ -0,0 +1,67 @@
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+async def run_batch(items: Sequence[T], worker: Callable[[T], Awaitable[Dict[str, Any]]],
+                    concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Przetwarza elementy równolegle z ograniczoną liczbą jednoczesnych zadań
+    i zwraca wyniki w kolejności ich ukończenia.
+
+    Args:
+        items: Elementy do przetworzenia
+        worker: Funkcja asynchroniczna przetwarzająca pojedynczy element
+        concurrency: Maksymalna liczba jednocześnie przetwarzanych elementów
+
+    Yields:
+        Wynik elementu z polami "index", "success", "duration_ms" oraz wynikiem
+        funkcji lub polem "error"
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_item(index: int, item: T) -> Dict[str, Any]:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = {"index": index, "success": True, **(await worker(item))}
+            except Exception as e:
+                logger.error(f"Błąd przetwarzania elementu {index} paczki: {str(e)}")
+                result = {"index": index, "success": False, "error": getattr(e, "detail", None) or str(e)}
+            result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            return result
+
+    tasks = [asyncio.ensure_future(run_item(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Anuluj pozostałe elementy, jeśli odbiorca przerwał iterację (np. klient się rozłączył)
+        for task in tasks:
+            task.cancel()
+
+def summarize_batch(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """
+    Tworzy podsumowanie przepustowości paczki
+
+    Args:
+        results: Wyniki elementów zwrócone przez run_batch
+        elapsed: Całkowity czas przetwarzania w sekundach
+
+    Returns:
+        Słownik z liczbą elementów, czasem całkowitym i przepustowością
+    """
+    succeeded = sum(1 for result in results if result["success"])
+    durations = [result["duration_ms"] for result in results]
+    return {
+        "items": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "total_ms": round(elapsed * 1000, 1),
+        "mean_item_ms": round(sum(durations) / len(durations), 1) if durations else None,
+        "items_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else None
+    }
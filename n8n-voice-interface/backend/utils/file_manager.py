@@ -1,4 +1,5 @@
 import os
+import re
 import uuid
 import logging
 import tempfile
@@ -60,6 +61,27 @@ class FileManager:
         logger.info(f"Zapisano dane do pliku tymczasowego: {file_path}")
         return file_path
     
+    @staticmethod
+    def find_temp_file(filename: str, prefix: str = "audio", suffix: str = ".mp3") -> Optional[str]:
+        """
+        Zwraca ścieżkę do pliku tymczasowego utworzonego przez save_bytes_to_temp_file
+        
+        Args:
+            filename: Nazwa pliku (bez katalogu)
+            prefix: Oczekiwany prefiks nazwy pliku
+            suffix: Oczekiwane rozszerzenie pliku
+            
+        Returns:
+            Ścieżka do pliku lub None, jeśli nazwa jest niepoprawna albo plik nie istnieje
+        """
+        # Akceptuj tylko nazwy w formacie prefix_uuid.suffix, aby zapobiec atakom path traversal
+        pattern = rf"{re.escape(prefix)}_[0-9a-f]{{8}}(-[0-9a-f]{{4}}){{3}}-[0-9a-f]{{12}}{re.escape(suffix)}"
+        if not re.fullmatch(pattern, filename):
+            return None
+        
+        file_path = os.path.join(tempfile.gettempdir(), filename)
+        return file_path if os.path.exists(file_path) else None
+    
     @staticmethod
     async def cleanup_temp_file(file_path: Optional[str]) -> None:
         """
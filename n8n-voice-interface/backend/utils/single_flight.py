@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """
+    Klasa łącząca równoczesne, identyczne wywołania w jedno.
+    Wywołania z tym samym kluczem czekają na wspólny wynik zamiast powtarzać płatne żądanie API.
+    """
+
+    def __init__(self, name: str):
+        """
+        Inicjalizuje grupę single-flight
+
+        Args:
+            name: Nazwa grupy używana w logach i statystykach
+        """
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Tworzy klucz na podstawie skrótu zawartości
+
+        Args:
+            parts: Fragmenty zawartości (bajty lub wartości konwertowane na tekst)
+
+        Returns:
+            Skrót SHA-256 w postaci szesnastkowej
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Wykonuje funkcję lub dołącza do trwającego wywołania z tym samym kluczem
+
+        Args:
+            key: Klucz identyfikujący pracę
+            func: Funkcja asynchroniczna wykonująca pracę
+
+        Returns:
+            Wynik funkcji (wspólny dla wszystkich połączonych wywołań)
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info(f"Połączono zduplikowane żądanie {self.name} (klucz: {key[:12]})")
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+
+        # Anulowanie jednego z oczekujących nie przerywa wspólnej pracy
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Oznacz wyjątek jako odebrany, nawet jeśli wszyscy oczekujący zostali anulowani
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Zwraca liczniki wywołań"""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
@@ -1,7 +1,11 @@
+import time
 import logging
 import json
-import aiohttp
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, Optional, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import aiohttp
+    from backend.endpoints import N8nEndpoint
 
 # Konfiguracja loggera
 logger = logging.getLogger(__name__)
@@ -20,24 +24,28 @@ class WebhookService:
             app_version: Wersja aplikacji do metadanych
         """
         self.app_version = app_version
+        self._session = None
         logger.info(f"Serwis Webhook zainicjowany (wersja aplikacji: {self.app_version})")
     
-    async def send_to_n8n(self, webhook_url: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def send_to_n8n(self, webhook_url: str, data: Dict[str, Any],
+                          endpoint: Optional["N8nEndpoint"] = None) -> Dict[str, Any]:
         """
         Wysyła dane do webhooka n8n i zwraca odpowiedź
         
         Args:
             webhook_url: URL webhooka n8n
             data: Dane do wysłania (zostaną przekonwertowane na JSON)
+            endpoint: Zarejestrowany endpoint, którego pula połączeń i statystyki zostaną użyte
             
         Returns:
-            Odpowiedź n8n jako słownik, z polem "text" zawierającym odpowiedź tekstową
-            
-        Raises:
-            Exception: W przypadku błędu komunikacji
+            Odpowiedź n8n jako słownik, z polem "text" zawierającym odpowiedź tekstową.
+            Przy błędzie komunikacji lub kodzie innym niż 200 słownik zawiera też "error": True
         """
         if not webhook_url:
             raise ValueError("URL webhooka nie może być pusty")
+        
+        # Import odroczony do pierwszego wywołania, aby przyspieszyć start aplikacji
+        import aiohttp
             
         try:
             logger.info(f"Wysyłanie danych do webhooka n8n: {webhook_url}")
@@ -52,33 +60,66 @@ class WebhookService:
                 }
             }
             
+            # Dołącz identyfikator sesji i okno kontekstu rozmowy, jeśli są dostępne
+            if data.get("session_id"):
+                payload["session_id"] = data["session_id"]
+            if data.get("context"):
+                payload["context"] = data["context"]
+            
             # Ustaw nagłówki
             headers = {
                 "Content-Type": "application/json",
                 "Accept": "application/json"
             }
             
-            # Wyślij żądanie asynchronicznie
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    webhook_url, 
-                    data=json.dumps(payload),
-                    headers=headers
-                ) as response:
-                    # Sprawdź odpowiedź
-                    if response.status == 200:
-                        response_text = await response.text()
-                        logger.info(f"Webhook zakończony pomyślnie. Odpowiedź: {response_text[:100]}...")
-                        
-                        return await self._parse_response(response_text)
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Webhook nie powiódł się z kodem {response.status}: {error_text}")
-                        return {"text": f"Błąd komunikacji z n8n (kod {response.status})"}
+            # Użyj rozgrzanej puli endpointu, jeśli jest dostępna
+            if endpoint is not None and endpoint.session is not None:
+                return await self._post(endpoint.session, webhook_url, payload, headers, endpoint)
+            
+            # Wyślij żądanie asynchronicznie przez współdzieloną sesję
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession()
+            return await self._post(self._session, webhook_url, payload, headers, endpoint)
         
         except Exception as e:
             logger.error(f"Błąd podczas wysyłania webhooka: {str(e)}", exc_info=True)
-            return {"text": f"Błąd komunikacji z n8n: {str(e)}"}
+            return {"text": f"Błąd komunikacji z n8n: {str(e)}", "error": True}
+    
+    async def _post(self, session: "aiohttp.ClientSession", webhook_url: str, payload: Dict[str, Any],
+                    headers: Dict[str, str], endpoint: Optional["N8nEndpoint"] = None) -> Dict[str, Any]:
+        """
+        Wykonuje żądanie POST do webhooka i zapisuje opóźnienie w statystykach endpointu
+        """
+        start = time.perf_counter()
+        ok = False
+        try:
+            async with session.post(
+                webhook_url, 
+                data=json.dumps(payload),
+                headers=headers
+            ) as response:
+                # Sprawdź odpowiedź
+                if response.status == 200:
+                    response_text = await response.text()
+                    ok = True
+                    logger.info(f"Webhook zakończony pomyślnie. Odpowiedź: {response_text[:100]}...")
+                    
+                    return await self._parse_response(response_text)
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Webhook nie powiódł się z kodem {response.status}: {error_text}")
+                    return {"text": f"Błąd komunikacji z n8n (kod {response.status})", "error": True}
+        finally:
+            if endpoint is not None:
+                endpoint.stats.record((time.perf_counter() - start) * 1000, ok)
+    
+    async def close(self) -> None:
+        """
+        Zamyka współdzieloną sesję HTTP
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
     
     async def _parse_response(self, response_text: str) -> Dict[str, Any]:
         """
@@ -115,13 +156,3 @@ class WebhookService:
         except json.JSONDecodeError:
             # Jeśli to nie JSON, użyj surowego tekstu
             return {"text": response_text}
-
-# Utwórz instancję serwisu dla łatwego importu
-webhook_service = WebhookService()
-
-# Funkcja kompatybilności wstecznej
-async def send_to_n8n(webhook_url: str, data: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Kompatybilność wsteczna z poprzednią wersją funkcji
-    """
-    return await webhook_service.send_to_n8n(webhook_url, data)
@@ -0,0 +1,131 @@
+"""
+Benchmark transkrypcji długich nagrań.
+
+Porównuje czas transkrypcji w zależności od długości nagrania dla trzech trybów:
+- w całości (jedno żądanie z całym nagraniem),
+- fragmentami sekwencyjnie (STT_CHUNK_CONCURRENCY=1),
+- fragmentami równolegle.
+
+Zamiast API OpenAI używany jest lokalny serwer zastępczy, którego czas odpowiedzi
+rośnie liniowo z długością przesłanego nagrania (--base-ms + --per-second-ms).
+Nagrania są syntetyczne: krótkie tony przedzielone pauzami, jak słowa i zdania.
+
+Uruchomienie (z katalogu głównego projektu): python benchmarks/chunked_stt.py [--lengths 30 60 120 240]
+"""
+import io
+import os
+import sys
+import time
+import wave
+import socket
+import asyncio
+import argparse
+import logging
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np
+from aiohttp import web
+
+from backend.stt import SpeechToTextService
+from backend.stt_router import SttRouter
+
+SAMPLE_RATE = 16000
+
+
+def synthesize_speech_like(seconds: float) -> bytes:
+    """Tworzy nagranie WAV z "słowami" (0.4 s tonu), krótkimi pauzami i dłuższą pauzą co 8 słów"""
+    pieces = []
+    t = np.arange(int(0.4 * SAMPLE_RATE)) / SAMPLE_RATE
+    word = (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16)
+    short_pause = np.zeros(int(0.15 * SAMPLE_RATE), dtype=np.int16)
+    long_pause = np.zeros(int(0.7 * SAMPLE_RATE), dtype=np.int16)
+    total, count = 0, 0
+    while total < seconds * SAMPLE_RATE:
+        pause = long_pause if count % 8 == 7 else short_pause
+        pieces.extend([word, pause])
+        total += len(word) + len(pause)
+        count += 1
+    samples = np.concatenate(pieces)[:int(seconds * SAMPLE_RATE)]
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def start_stub(base_ms: float, per_second_ms: float) -> tuple:
+    """Uruchamia serwer zastępczy API transkrypcji i zwraca (runner, url)"""
+    async def transcriptions(request: web.Request) -> web.Response:
+        form = await request.post()
+        data = form["file"].file.read()
+        with wave.open(io.BytesIO(data)) as f:
+            duration = f.getnframes() / f.getframerate()
+        await asyncio.sleep((base_ms + per_second_ms * duration) / 1000)
+        return web.json_response({"text": f"[{duration:.1f}s]"})
+
+    app = web.Application(client_max_size=200 * 1024 * 1024)
+    app.router.add_post("/v1/audio/transcriptions", transcriptions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = _free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, f"http://127.0.0.1:{port}/v1/audio/transcriptions"
+
+
+async def measure(service: SpeechToTextService, content: bytes, threshold: float, concurrency: int) -> tuple:
+    """Zwraca (czas w sekundach, liczba fragmentów) jednej transkrypcji"""
+    service.chunk_threshold = threshold
+    service.chunk_concurrency = concurrency
+    start = time.perf_counter()
+    result = await service.transcribe(content)
+    return time.perf_counter() - start, result.get("chunks", 1)
+
+
+async def run(args: argparse.Namespace) -> None:
+    runner, url = await start_stub(args.base_ms, args.per_second_ms)
+    service = SpeechToTextService(api_key="benchmark", router=SttRouter(["whisper-1"]))
+    service.api_url = url
+    # Próg 1 s wymusza dzielenie niezależnie od szacowania długości z rozmiaru pliku
+    modes = [("w całości", 0, 1), ("fragmenty sekwencyjnie", 1, 1),
+             ("fragmenty równolegle", 1, args.concurrency)]
+
+    print(f"{'długość':>9} " + " ".join(f"{name:>24}" for name, _, _ in modes))
+    try:
+        for seconds in args.lengths:
+            content = synthesize_speech_like(seconds)
+            cells = []
+            for _, threshold, concurrency in modes:
+                elapsed, chunks = await measure(service, content, threshold, concurrency)
+                cells.append(f"{elapsed * 1000:12.0f} ms ({chunks:2d} fr.)")
+            print(f"{seconds:>8.0f}s " + " ".join(f"{cell:>24}" for cell in cells))
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=float, nargs="+", default=[30, 60, 120, 240],
+                        help="Długości nagrań w sekundach")
+    parser.add_argument("--concurrency", type=int, default=4, help="Liczba równoległych fragmentów")
+    parser.add_argument("--base-ms", type=float, default=300, help="Stały czas odpowiedzi serwera zastępczego")
+    parser.add_argument("--per-second-ms", type=float, default=40,
+                        help="Dodatkowy czas odpowiedzi na sekundę nagrania")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark czasu startu aplikacji.
+
+Mierzy:
+- zimny import modułu backend.app w nowym procesie,
+- czas od uruchomienia serwera do pierwszej poprawnej odpowiedzi /api/health,
+  bez konfiguracji oraz z zarejestrowanymi endpointami n8n (nieosiągalnymi, więc sonda
+  trwa do N8N_HEALTH_TIMEOUT) i dziennikiem historii do odtworzenia.
+
+Uruchomienie (z katalogu głównego projektu): python benchmarks/startup.py [--runs 5]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import argparse
+import statistics
+import subprocess
+import urllib.request
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PROJECT_ROOT
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def measure_import() -> float:
+    """Zwraca czas zimnego importu backend.app w sekundach"""
+    code = "import time; t = time.perf_counter(); import backend.app; print(time.perf_counter() - t)"
+    output = subprocess.check_output(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, env=_env(), stderr=subprocess.DEVNULL
+    )
+    return float(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_history_log(path: str, messages: int, sessions: int = 1000) -> None:
+    """Zapisuje dziennik historii z zadaną liczbą wiadomości rozłożonych na sesje"""
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(messages):
+            record = {"session_id": f"session-{i % sessions}", "role": "user" if i % 2 else "assistant",
+                      "text": f"Wiadomość testowa numer {i}", "timestamp": 1700000000 + i}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def endpoints_config(count: int) -> str:
+    """Konfiguracja N8N_ENDPOINTS z endpointami pod nieosiągalnym adresem (sonda kończy się limitem czasu)"""
+    return json.dumps({f"n8n-{i}": f"http://10.255.255.1:5678/webhook/{i}" for i in range(count)})
+
+
+def measure_first_healthy(timeout: float = 30.0, extra_env: Optional[Dict[str, str]] = None) -> float:
+    """Zwraca czas od uruchomienia serwera do pierwszej odpowiedzi 200 z /api/health"""
+    port = _free_port()
+    env = _env()
+    env.update({"PORT": str(port), "HOST": "127.0.0.1", "UVICORN_ACCESS_LOG": "false"})
+    env.update(extra_env or {})
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.server"], cwd=PROJECT_ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/api/health"
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("Serwer nie odpowiedział na czas")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _report(name: str, samples: List[float]) -> None:
+    print(
+        f"{name:<28} median {statistics.median(samples) * 1000:8.1f} ms  "
+        f"min {min(samples) * 1000:8.1f} ms  max {max(samples) * 1000:8.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Liczba powtórzeń każdego pomiaru")
+    parser.add_argument("--endpoints", type=int, default=3, help="Liczba zarejestrowanych endpointów n8n")
+    parser.add_argument("--history", type=int, default=200000, help="Liczba wiadomości w dzienniku historii")
+    args = parser.parse_args()
+
+    _report("cold import backend.app", [measure_import() for _ in range(args.runs)])
+    _report("time to first /api/health", [measure_first_healthy() for _ in range(args.runs)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        samples = []
+        for _ in range(args.runs):
+            # Dziennik jest przepisywany przy odtwarzaniu, więc twórz go przed każdym pomiarem
+            history_path = os.path.join(directory, "history.jsonl")
+            write_history_log(history_path, args.history)
+            samples.append(measure_first_healthy(extra_env={
+                "N8N_ENDPOINTS": endpoints_config(args.endpoints),
+                "HISTORY_LOG_PATH": history_path,
+            }))
+        _report("  with endpoints and history", samples)
+
+
+if __name__ == "__main__":
+    main()
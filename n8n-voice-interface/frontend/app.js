@@ -149,7 +149,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 },
                 body: JSON.stringify({
                     text: text,
-                    webhook_url: webhookUrl
+                    ...webhookTarget(webhookUrl)
                 })
             });
             
@@ -164,26 +164,12 @@ document.addEventListener('DOMContentLoaded', () => {
             
             const data = await response.json();
             
-            // Obsłuż odpowiedź n8n
+            // Obsłuż odpowiedź n8n; audio generowane na serwerze przychodzi zdarzeniem "audio"
             if (data.n8nResponse && data.n8nResponse.text) {
-                handleN8nResponse(data.n8nResponse.text, entryId);
+                const audioUrl = await waitForTurnAudio(data.turn_id);
+                handleN8nResponse(data.n8nResponse.text, entryId, audioUrl);
             } else {
-                // Pobierz ostatnią odpowiedź
-                try {
-                    const n8nResponse = await fetch('/api/last-response-tts');
-                    if (n8nResponse.ok) {
-                        const responseData = await n8nResponse.json();
-                        if (responseData.text) {
-                            handleN8nResponse(responseData.text, entryId, responseData.audio_url);
-                        } else {
-                            handleDefaultResponse(entryId);
-                        }
-                    } else {
-                        handleDefaultResponse(entryId);
-                    }
-                } catch (error) {
-                    handleDefaultResponse(entryId);
-                }
+                handleDefaultResponse(entryId);
             }
             
             statusMessage.textContent = 'Gotowy do wysyłania wiadomości';
@@ -195,6 +181,34 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    // Poczekaj na audio odpowiedzi z kanału zdarzeń; null oznacza, że trzeba je wygenerować przez /api/speak
+    async function waitForTurnAudio(turnId) {
+        if (!window.turnEvents) return null;
+        try {
+            const audio = await window.turnEvents.waitForAudio(turnId);
+            return audio.audio_url;
+        } catch (error) {
+            console.warn('Brak audio z kanału zdarzeń:', error.message);
+            return null;
+        }
+    }
+    
+    // Wiadomości wysłane przez n8n do przeglądarki (/api/speak z push=true)
+    if (window.turnEvents) {
+        window.turnEvents.onMessage(data => {
+            const entryId = `entry-${Date.now()}`;
+            addConversationEntry(entryId);
+            document.querySelector(`#${entryId} .user-message`).classList.add('hidden');
+            updateConversationEntryWithResponse(entryId, data.text, data.audio_url);
+            playAudioResponse(data.audio_url);
+        });
+    }
+    
+    // Ustaw pole webhooka: pełny URL lub nazwa endpointu zarejestrowanego na serwerze
+    function webhookTarget(value) {
+        return /^https?:\/\//i.test(value) ? { webhook_url: value } : { webhook: value };
+    }
+    
     // Funkcje obsługi konwersacji
     function addConversationEntry(entryId) {
         // Usuń najstarsze wpisy, jeśli mamy ich za dużo
@@ -18,28 +18,30 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     }
     
-    // Poczekaj 2 sekundy, żeby strona się załadowała
-    setTimeout(async () => {
+    // Poczekaj na połączenie kanału zdarzeń, aby audio pierwszej odpowiedzi nie zostało pominięte
+    if (window.turnEvents) {
+        await window.turnEvents.ready;
+    }
+    
+    try {
+        // Najpierw odtwórz powitanie
+        console.log('Powitanie rozpoczęte');
+        const greetingSuccess = await window.playGreeting();
+        
+        // Nawet jeśli powitanie się nie udało, kontynuuj z nasłuchiwaniem
+        console.log('Powitanie ' + (greetingSuccess ? 'zakończone' : 'nie powiodło się') + ', uruchamiam nasłuchiwanie');
+        
+        // Następnie uruchom ciągłe nasłuchiwanie
+        await window.toggleContinuousListening();
+    } catch (error) {
+        console.error('error:', error);
+        
+        // Mimo błędu, spróbuj uruchomić nasłuchiwanie
         try {
-            // Najpierw odtwórz powitanie
-            console.log('Powitanie rozpoczęte');
-            const greetingSuccess = await window.playGreeting();
-            
-            // Nawet jeśli powitanie się nie udało, kontynuuj z nasłuchiwaniem
-            console.log('Powitanie ' + (greetingSuccess ? 'zakończone' : 'nie powiodło się') + ', uruchamiam nasłuchiwanie');
-            
-            // Następnie uruchom ciągłe nasłuchiwanie
+            console.log('Próba uruchomienia nasłuchiwania mimo błędu powitania...');
             await window.toggleContinuousListening();
-        } catch (error) {
-            console.error('error:', error);
-            
-            // Mimo błędu, spróbuj uruchomić nasłuchiwanie
-            try {
-                console.log('Próba uruchomienia nasłuchiwania mimo błędu powitania...');
-                await window.toggleContinuousListening();
-            } catch (listeningError) {
-                console.error('Nie udało się uruchomić nasłuchiwania:', listeningError);
-            }
+        } catch (listeningError) {
+            console.error('Nie udało się uruchomić nasłuchiwania:', listeningError);
         }
-    }, 2000);
+    }
 });
@@ -0,0 +1,76 @@
+// Kanał zdarzeń serwera (Server-Sent Events) dla bieżącej sesji
+// Zastępuje odpytywanie /api/last-response-tts i opóźnienia setTimeout:
+// serwer wysyła zdarzenie, gdy audio odpowiedzi jest gotowe.
+
+(() => {
+    // Czas oczekiwania na audio, po którym klient wygeneruje je sam przez /api/speak
+    const AUDIO_TIMEOUT = 20000;
+
+    const pendingTurns = new Map();   // turn_id -> { resolve, reject, timer }
+    const earlyEvents = new Map();    // zdarzenia audio, które dotarły przed odpowiedzią HTTP
+    const messageHandlers = [];
+
+    let source = null;
+    let resolveReady;
+    const ready = new Promise(resolve => { resolveReady = resolve; });
+
+    if (window.EventSource) {
+        source = new EventSource('/api/events');
+        source.addEventListener('open', () => resolveReady(true));
+        // Przy błędzie EventSource łączy się ponownie sam; nie blokuj startu aplikacji
+        source.addEventListener('error', () => resolveReady(false));
+
+        source.addEventListener('audio', event => settleTurn(JSON.parse(event.data), true));
+        source.addEventListener('audio_failed', event => settleTurn(JSON.parse(event.data), false));
+        source.addEventListener('speak', event => {
+            const data = JSON.parse(event.data);
+            messageHandlers.forEach(handler => handler(data));
+        });
+    } else {
+        resolveReady(false);
+    }
+
+    function settleTurn(data, success) {
+        const pending = pendingTurns.get(data.turn_id);
+        if (!pending) {
+            earlyEvents.set(data.turn_id, { data, success });
+            // Nie przechowuj zdarzeń, na które nikt nie czeka
+            setTimeout(() => earlyEvents.delete(data.turn_id), AUDIO_TIMEOUT);
+            return;
+        }
+        pendingTurns.delete(data.turn_id);
+        clearTimeout(pending.timer);
+        if (success) {
+            pending.resolve(data);
+        } else {
+            pending.reject(new Error(data.error || 'Nie udało się wygenerować audio'));
+        }
+    }
+
+    // Czeka na zdarzenie "audio" dla tury; zwraca { audio_url, duration }
+    function waitForAudio(turnId, timeout = AUDIO_TIMEOUT) {
+        const early = earlyEvents.get(turnId);
+        if (early) {
+            earlyEvents.delete(turnId);
+            return early.success ? Promise.resolve(early.data) : Promise.reject(new Error(early.data.error));
+        }
+        // W trakcie ponownego łączenia zdarzenie dotrze po połączeniu (Last-Event-ID)
+        if (!turnId || !source || source.readyState === EventSource.CLOSED) {
+            return Promise.reject(new Error('Kanał zdarzeń nie jest połączony'));
+        }
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                pendingTurns.delete(turnId);
+                reject(new Error('Nie otrzymano audio odpowiedzi na czas'));
+            }, timeout);
+            pendingTurns.set(turnId, { resolve, reject, timer });
+        });
+    }
+
+    // Rejestruje obsługę wiadomości wysłanych przez n8n (/api/speak z push=true)
+    function onMessage(handler) {
+        messageHandlers.push(handler);
+    }
+
+    window.turnEvents = { ready, waitForAudio, onMessage };
+})();
@@ -372,7 +372,9 @@ document.addEventListener('DOMContentLoaded', () => {
             // Create form data for the API request
             const formData = new FormData();
             formData.append('audio', audioBlob, `recording-${recordingId}.mp3`);
-            formData.append('webhook_url', webhookUrl);
+            // Full URL or the name of an endpoint registered on the server
+            const webhookField = /^https?:\/\//i.test(webhookUrl) ? 'webhook_url' : 'webhook';
+            formData.append(webhookField, webhookUrl);
             
             console.log(`Wysyłanie nagrania do API, format: ${audioBlob.type}`);
             
@@ -399,35 +401,13 @@ document.addEventListener('DOMContentLoaded', () => {
             // Update the conversation entry with the transcription
             updateConversationEntryWithTranscription(entryId, data.text);
             
-            // Process the response from n8n
+            // Process the response from n8n; server-side audio arrives as an "audio" event
             if (data.n8nResponse && data.n8nResponse.text) {
                 console.log(`Otrzymano natychmiastową odpowiedź dla nagrania #${recordingId}`);
-                handleN8nResponse(data.n8nResponse.text, entryId);
+                const audioUrl = await waitForTurnAudio(data.turn_id);
+                handleN8nResponse(data.n8nResponse.text, entryId, audioUrl);
             } else {
-                // Try to get the response via last-response-tts endpoint
-                try {
-                    const n8nResponse = await fetch('/api/last-response-tts', {
-                        method: 'GET',
-                        headers: {
-                            'Accept': 'application/json',
-                        },
-                    });
-                    
-                    if (n8nResponse.ok) {
-                        const responseData = await n8nResponse.json();
-                        
-                        if (responseData.text && responseData.audio_url) {
-                            handleN8nResponse(responseData.text, entryId, responseData.audio_url);
-                        } else {
-                            handleDefaultResponse(entryId);
-                        }
-                    } else {
-                        handleDefaultResponse(entryId);
-                    }
-                } catch (error) {
-                    console.error(`Błąd podczas pobierania odpowiedzi dla nagrania #${recordingId}:`, error);
-                    handleDefaultResponse(entryId);
-                }
+                handleDefaultResponse(entryId);
             }
         } catch (error) {
             console.error(`Błąd podczas przetwarzania nagrania #${recordingId}:`, error);
@@ -438,6 +418,18 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    // Wait for the reply audio on the event channel; null means it has to be generated via /api/speak
+    async function waitForTurnAudio(turnId) {
+        if (!window.turnEvents) return null;
+        try {
+            const audio = await window.turnEvents.waitForAudio(turnId);
+            return audio.audio_url;
+        } catch (error) {
+            console.warn('Brak audio z kanału zdarzeń:', error.message);
+            return null;
+        }
+    }
+    
     // Handle n8n response
     async function handleN8nResponse(text, entryId, audioUrl = null) {
         try {
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Testy uruchamiane z katalogu głównego projektu importują pakiet backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,102 @@
+import io
+import wave
+
+from backend.utils.audio import estimate_duration, find_split_points, split_audio, wav_duration
+
+
+def make_wav(seconds, rate=16000, channels=1):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"\x00\x00" * channels * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def test_wav_duration_is_read_from_header():
+    assert estimate_duration(make_wav(101)) == 101
+    assert estimate_duration(make_wav(3.5, rate=44100, channels=2)) == 3.5
+
+
+def test_wav_with_streaming_data_size_uses_available_bytes():
+    content = bytearray(make_wav(2))
+    content[40:44] = b"\xff\xff\xff\xff"
+    assert wav_duration(bytes(content)) == 2
+
+
+def test_mp3_duration_is_read_from_first_frame():
+    # MPEG-1 Layer III, 128 kb/s: 16000 bajtów = 1 s
+    content = b"\xff\xfb\x90\x00" + b"\x00" * 15996
+    assert estimate_duration(content) == 1
+
+
+def test_other_formats_use_assumed_bitrate():
+    content = b"\x1a\x45\xdf\xa3" + b"\x00" * 15996
+    assert estimate_duration(content, bitrate_kbps=128) == 1
+    assert wav_duration(content) is None
+
+
+RATE = 16000
+
+
+def signal(*segments):
+    """Sygnał testowy z odcinków (sekundy, czy ton 440 Hz) jako próbki int16"""
+    import numpy as np
+
+    parts = []
+    for seconds, tone in segments:
+        t = np.arange(int(seconds * RATE)) / RATE
+        parts.append((np.sin(2 * np.pi * 440 * t) * 10000 * tone).astype(np.int16))
+    return np.concatenate(parts)
+
+
+def to_wav(samples):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def test_split_points_land_in_silence():
+    samples = signal((28, True), (0.6, False), (31, True))
+
+    points = find_split_points(samples, RATE, chunk_seconds=30)
+
+    assert len(points) == 1
+    sample, is_silent = points[0]
+    assert is_silent and 28 * RATE <= sample <= 28.6 * RATE
+
+
+def test_split_points_without_silence_stay_near_target():
+    samples = signal((70, True))
+
+    points = find_split_points(samples, RATE, chunk_seconds=30)
+
+    assert len(points) == 2
+    assert all(not is_silent for _, is_silent in points)
+    # Granica leży w ostatniej ćwiartce fragmentu lub tuż za nią
+    assert 22.5 * RATE <= points[0][0] <= 33.75 * RATE
+
+
+def test_short_recording_is_not_split():
+    assert find_split_points(signal((20, True)), RATE, chunk_seconds=30) == []
+
+
+def test_chunks_split_in_silence_do_not_overlap():
+    chunks = split_audio(to_wav(signal((28, True), (0.6, False), (31, True))), chunk_seconds=30, overlap_ms=500)
+
+    assert [overlaps for _, _, overlaps in chunks] == [False, False]
+    assert abs(sum(duration for _, duration, _ in chunks) - 59.6) < 0.05
+    assert all(wav_duration(chunk) == duration for chunk, duration, _ in chunks)
+
+
+def test_chunks_split_outside_silence_overlap_on_both_sides():
+    chunks = split_audio(to_wav(signal((70, True))), chunk_seconds=30, overlap_ms=500)
+
+    assert [overlaps for _, _, overlaps in chunks] == [False, True, True]
+    # Każda granica poza ciszą wydłuża oba sąsiednie fragmenty o zakładkę
+    assert abs(sum(duration for _, duration, _ in chunks) - (70 + 2 * 2 * 0.5)) < 0.05
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from backend import app as app_module
+from backend.services import get_services
+from backend.utils.batch import run_batch, summarize_batch
+
+
+def collect(items, worker, concurrency):
+    async def run():
+        return [result async for result in run_batch(items, worker, concurrency)]
+    return asyncio.run(run())
+
+
+def test_run_batch_respects_concurrency_limit():
+    running = 0
+    peak = 0
+
+    async def worker(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"item": item}
+
+    results = collect(list(range(10)), worker, concurrency=3)
+
+    assert peak == 3
+    assert sorted(result["index"] for result in results) == list(range(10))
+
+
+def test_run_batch_reports_failed_items():
+    async def worker(item):
+        if item == "zły":
+            raise HTTPException(status_code=502, detail="Błąd komunikacji z n8n (kod 500)")
+        return {"text": item}
+
+    results = sorted(collect(["dobry", "zły"], worker, concurrency=2), key=lambda result: result["index"])
+
+    assert results[0]["success"] is True and results[0]["text"] == "dobry"
+    assert results[1]["success"] is False and results[1]["error"] == "Błąd komunikacji z n8n (kod 500)"
+    assert summarize_batch(results, 0.5)["failed"] == 1
+
+
+def test_summarize_batch_reports_throughput():
+    results = [{"success": True, "duration_ms": 100}, {"success": False, "duration_ms": 300}]
+
+    summary = summarize_batch(results, 0.5)
+
+    assert summary == {"items": 2, "succeeded": 1, "failed": 1, "total_ms": 500.0,
+                       "mean_item_ms": 200.0, "items_per_second": 4.0}
+
+
+class FakeWebhook:
+    """n8n odpowiadający z opóźnieniem malejącym z numerem wiadomości; "błąd" zwraca błąd HTTP"""
+
+    async def send_to_n8n(self, webhook_url, data, endpoint=None):
+        text = data["transcription"]
+        await asyncio.sleep(0.03 - 0.01 * int(text[-1]))
+        if text.startswith("błąd"):
+            return {"text": "Błąd komunikacji z n8n (kod 500)", "error": True}
+        return {"text": f"odpowiedź na {text}"}
+
+
+class FakeTts:
+    async def text_to_speech(self, text):
+        return f"/tmp/{text}.mp3"
+
+
+class FakeServices:
+    webhook = FakeWebhook()
+    tts = FakeTts()
+
+
+@pytest.fixture
+def client():
+    app_module.app.dependency_overrides[get_services] = lambda: FakeServices()
+    yield TestClient(app_module.app)
+    app_module.app.dependency_overrides.clear()
+
+
+def test_batch_text_message_sorts_results_and_marks_failures(client):
+    response = client.post("/api/batch/text-message", json={
+        "texts": ["wiadomość 0", "błąd 1", "wiadomość 2"],
+        "webhook_url": "http://n8n.local/webhook/abc",
+    })
+
+    body = response.json()
+    assert response.status_code == 200
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert [result["success"] for result in body["results"]] == [True, False, True]
+    assert body["results"][1]["error"] == "Błąd komunikacji z n8n (kod 500)"
+    assert body["results"][2]["n8nResponse"] == {"text": "odpowiedź na wiadomość 2"}
+    assert body["summary"]["succeeded"] == 2 and body["summary"]["failed"] == 1
+
+
+def test_batch_stream_ends_with_summary_line(client):
+    response = client.post("/api/batch/speak", json={"texts": ["a0", "b1", "c2"], "stream": True})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1, 2]
+    assert lines[0]["audio_url"].startswith("/api/audio/")
+    assert lines[-1]["summary"]["items"] == 3
+
+
+def test_batch_rejects_empty_and_oversized_requests(client, monkeypatch):
+    monkeypatch.setattr(app_module, "BATCH_MAX_ITEMS", 2)
+
+    assert client.post("/api/batch/speak", json={"texts": []}).status_code == 400
+    assert client.post("/api/batch/speak", json={"texts": ["a0", "b1", "c2"]}).status_code == 413
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+from fastapi import HTTPException
+
+from backend import app as app_module
+from backend.endpoints import EndpointRegistry, N8nEndpoint, default_health_url
+
+
+def test_health_url_defaults_to_instance_healthz():
+    assert default_health_url("https://n8n.example.com/webhook/abc") == "https://n8n.example.com/healthz"
+    assert default_health_url("https://host/n8n/webhook-test/abc?x=1") == "https://host/n8n/healthz"
+    assert default_health_url("http://host:5678/custom/path") == "http://host:5678/healthz"
+
+
+def test_registry_from_env_merges_file_and_variable(tmp_path, monkeypatch):
+    config_file = tmp_path / "endpoints.json"
+    config_file.write_text(json.dumps({
+        "home": {"url": "https://a.example.com/webhook/1", "health_url": "https://a.example.com/ok", "pool_size": 3},
+        "work": "https://b.example.com/webhook/2",
+    }))
+    monkeypatch.setenv("N8N_ENDPOINTS_FILE", str(config_file))
+    monkeypatch.setenv("N8N_ENDPOINTS", json.dumps({"work": "https://c.example.com/webhook/3"}))
+    monkeypatch.delenv("ALLOW_CUSTOM_WEBHOOK_URLS", raising=False)
+
+    registry = EndpointRegistry.from_env()
+
+    assert registry.get("home").health_url == "https://a.example.com/ok"
+    assert registry.get("home").pool_size == 3
+    assert registry.get("work").url == "https://c.example.com/webhook/3"
+    assert registry.get("work").health_url == "https://c.example.com/healthz"
+    assert registry.allow_custom_urls is False
+
+
+def test_registry_without_endpoints_allows_custom_urls(monkeypatch):
+    monkeypatch.delenv("N8N_ENDPOINTS_FILE", raising=False)
+    monkeypatch.delenv("N8N_ENDPOINTS", raising=False)
+    monkeypatch.setenv("ALLOW_CUSTOM_WEBHOOK_URLS", "false")
+
+    registry = EndpointRegistry.from_env()
+
+    assert not registry.endpoints and registry.allow_custom_urls is False
+
+
+@pytest.mark.parametrize("status, healthy", [(200, True), (404, None), (405, None), (503, False)])
+def test_probe_maps_status_to_health(status, healthy):
+    async def run():
+        async def healthz(request):
+            return web.Response(status=status)
+
+        server_app = web.Application()
+        server_app.router.add_route("HEAD", "/healthz", healthz)
+        runner = web.AppRunner(server_app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        endpoint = N8nEndpoint("home", f"http://127.0.0.1:{port}/webhook/abc")
+        try:
+            await endpoint.start()
+            return await endpoint.probe()
+        finally:
+            await endpoint.close()
+            await runner.cleanup()
+
+    assert asyncio.run(run()) is healthy
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = EndpointRegistry([N8nEndpoint("home", "https://n8n.example.com/webhook/abc")])
+    monkeypatch.setattr(app_module, "endpoint_registry", registry)
+    return registry
+
+
+def test_resolve_webhook_by_name_and_registered_url(registry):
+    endpoint = registry.get("home")
+
+    assert app_module.resolve_webhook("home", None) == (endpoint.url, endpoint)
+    assert app_module.resolve_webhook(None, endpoint.url) == (endpoint.url, endpoint)
+
+
+def test_resolve_webhook_rejects_unknown_name(registry):
+    with pytest.raises(HTTPException) as error:
+        app_module.resolve_webhook("missing", None)
+    assert error.value.status_code == 404
+
+
+def test_resolve_webhook_rejects_unregistered_url(registry):
+    with pytest.raises(HTTPException) as error:
+        app_module.resolve_webhook(None, "https://evil.example.com/hook")
+    assert error.value.status_code == 403
+
+
+def test_resolve_webhook_accepts_custom_url_when_allowed(registry):
+    registry.allow_custom_urls = True
+
+    assert app_module.resolve_webhook(None, "https://other.example.com/hook") == ("https://other.example.com/hook", None)
+
+
+def test_resolve_webhook_requires_name_or_url(registry):
+    with pytest.raises(HTTPException) as error:
+        app_module.resolve_webhook(None, None)
+    assert error.value.status_code == 400
@@ -0,0 +1,115 @@
+import asyncio
+
+from backend.events import EventBroker
+
+
+def collect(broker, session_id, last_event_id=None):
+    """Otwiera strumień sesji na chwilę i zwraca odebrane zdarzenia (bez komentarzy i ramki retry)"""
+    async def read():
+        chunks = []
+        async for chunk in broker.stream(session_id, last_event_id, max_seconds=0.05, keepalive=1):
+            chunks.append(chunk)
+        return [chunk for chunk in chunks if "\nevent: " in chunk]
+    return asyncio.run(read())
+
+
+def test_broadcast_reaches_session_between_reconnects():
+    broker = EventBroker()
+    collect(broker, "a")
+
+    delivered = broker.broadcast("speak", {"text": "cześć"})
+    events = collect(broker, "a", last_event_id=0)
+
+    assert delivered == 1
+    assert len(events) == 1 and "event: speak" in events[0]
+
+
+def test_broadcast_skips_sessions_that_did_not_reconnect():
+    broker = EventBroker(recent_seconds=0)
+    collect(broker, "a")
+
+    assert broker.broadcast("speak", {"text": "cześć"}) == 0
+    assert not broker.is_connected("a")
+    assert broker.stats()["reconnecting_sessions"] == 0
+
+
+def test_session_is_connected_only_after_opening_stream():
+    broker = EventBroker()
+
+    assert not broker.is_connected("a")
+    collect(broker, "a")
+    assert broker.is_connected("a")
+
+
+def test_stream_closes_when_server_stops_accepting():
+    broker = EventBroker()
+    is_open = iter([True, False])
+
+    async def read():
+        return [chunk async for chunk in broker.stream("a", max_seconds=30, is_open=lambda: next(is_open))]
+
+    chunks = asyncio.run(asyncio.wait_for(read(), timeout=5))
+
+    assert len(chunks) == 1 and "retry: 1000" in chunks[0]
+
+
+def event_id(chunk):
+    return int(chunk.split("\n")[0][len("id: "):])
+
+
+def stream_live(broker, session_id, last_event_id, publish):
+    """Otwiera strumień, publikuje zdarzenia w trakcie i zwraca wszystkie ramki"""
+    async def read():
+        chunks = []
+
+        async def consume():
+            async for chunk in broker.stream(session_id, last_event_id, max_seconds=0.2, keepalive=1):
+                chunks.append(chunk)
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.05)
+        publish()
+        await task
+        return chunks
+    return asyncio.run(read())
+
+
+def test_event_ids_keep_growing_after_restart():
+    before = EventBroker()
+    old_id = before.publish("a", "audio", {"turn_id": "1"})
+    restarted = EventBroker()
+
+    chunks = stream_live(restarted, "a", old_id, lambda: restarted.publish("a", "audio", {"turn_id": "2"}))
+
+    assert any('"turn_id": "2"' in chunk for chunk in chunks)
+    assert event_id(chunks[-1]) > old_id
+
+
+def test_cursor_from_the_future_replays_backlog():
+    broker = EventBroker()
+    broker.publish("a", "speak", {"text": "cześć"})
+
+    events = collect(broker, "a", last_event_id=broker.publish("b", "speak", {}) + 10 ** 9)
+
+    assert len(events) == 1
+
+
+def test_first_frame_carries_cursor_for_events_published_between_streams():
+    broker = EventBroker()
+    first = stream_live(broker, "a", None, lambda: None)
+    cursor = event_id(first[0])
+
+    broker.publish("a", "audio", {"turn_id": "1"})
+    events = collect(broker, "a", last_event_id=cursor)
+
+    assert first[0].startswith("id: ") and "retry: " in first[0]
+    assert len(events) == 1 and '"turn_id": "1"' in events[0]
+
+
+def test_disconnected_sessions_are_pruned_without_broadcasts():
+    broker = EventBroker(recent_seconds=0)
+    collect(broker, "a")
+
+    broker.publish("b", "speak", {})
+
+    assert not broker._disconnected_at
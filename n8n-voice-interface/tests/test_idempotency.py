@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.idempotency import IdempotencyManager, InMemoryIdempotencyStore
+
+
+class Turn:
+    """Fałszywa tura rozmowy licząca wykonania"""
+
+    def __init__(self, result=None, error=None, delay=0):
+        self.calls = 0
+        self.result = result or {"text": "odpowiedź"}
+        self.error = error
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return dict(self.result)
+
+
+def test_result_is_replayed_for_repeated_key():
+    manager = IdempotencyManager()
+    turn = Turn()
+
+    async def run():
+        first = await manager.run("k", "fp", turn)
+        second = await manager.run("k", "fp", turn)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == ({"text": "odpowiedź"}, False)
+    assert second == ({"text": "odpowiedź"}, True)
+    assert turn.calls == 1 and manager.stats()["replays"] == 1
+
+
+def test_key_reused_for_different_request_is_rejected():
+    manager = IdempotencyManager()
+
+    async def run():
+        await manager.run("k", "fpA", Turn())
+        await manager.run("k", "fpB", Turn())
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 422
+
+
+def test_concurrent_key_reuse_for_different_request_is_rejected():
+    manager = IdempotencyManager()
+
+    async def run():
+        return await asyncio.gather(
+            manager.run("k", "fpA", Turn({"text": "A"}, delay=0.01)),
+            manager.run("k", "fpB", Turn({"text": "B"}, delay=0.01)),
+            return_exceptions=True
+        )
+
+    first, second = asyncio.run(run())
+
+    assert first == ({"text": "A"}, False)
+    assert isinstance(second, HTTPException) and second.status_code == 422
+    assert manager.stats()["in_flight"] == 0
+
+
+def test_concurrent_retry_waits_for_turn_in_flight():
+    manager = IdempotencyManager()
+    turn = Turn(delay=0.01)
+
+    async def run():
+        return await asyncio.gather(manager.run("k", "fp", turn), manager.run("k", "fp", turn))
+
+    results = asyncio.run(run())
+
+    assert turn.calls == 1
+    assert sorted(replayed for _, replayed in results) == [False, True]
+
+
+def test_failures_are_not_stored():
+    manager = IdempotencyManager()
+    failing = Turn(error=HTTPException(status_code=502, detail="Błąd komunikacji z n8n"))
+    succeeding = Turn()
+
+    async def run():
+        with pytest.raises(HTTPException):
+            await manager.run("k", "fp", failing)
+        return await manager.run("k", "fp", succeeding)
+
+    assert asyncio.run(run()) == ({"text": "odpowiedź"}, False)
+    assert succeeding.calls == 1
+
+
+def test_store_expires_entries_after_ttl():
+    store = InMemoryIdempotencyStore()
+
+    async def run():
+        await store.set("k", {"result": 1}, ttl=0)
+        return await store.get("k")
+
+    assert asyncio.run(run()) is None
+    assert len(store) == 0
+
+
+def test_store_evicts_least_recently_used_entries():
+    store = InMemoryIdempotencyStore(max_entries=2)
+
+    async def run():
+        await store.set("a", {"result": 1}, ttl=60)
+        await store.set("b", {"result": 2}, ttl=60)
+        await store.get("a")
+        await store.set("c", {"result": 3}, ttl=60)
+        return [await store.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [{"result": 1}, None, {"result": 3}]
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend import lifecycle
+from backend.lifecycle import TurnTracker, begin_shutdown, shutdown_remaining
+
+
+@pytest.fixture(autouse=True)
+def reset_shutdown(monkeypatch):
+    monkeypatch.setattr(lifecycle, "_shutdown_deadline", None)
+    yield
+    # begin_shutdown dotyczy wszystkich trackerów procesu, także tracker aplikacji
+    for tracker in list(lifecycle._trackers):
+        tracker.start_accepting()
+
+
+def test_signal_stops_admission_before_application_shutdown():
+    tracker = TurnTracker()
+
+    begin_shutdown(30)
+
+    with pytest.raises(HTTPException) as error:
+        tracker.ensure_accepting()
+    assert error.value.status_code == 503
+
+
+def test_drain_gets_only_time_left_until_shared_deadline():
+    assert shutdown_remaining(30) == 30
+
+    begin_shutdown(30)
+    begin_shutdown(60)
+
+    assert 29 < shutdown_remaining(30) <= 30
+
+
+def test_drain_cancels_background_tasks_after_deadline():
+    tracker = TurnTracker()
+
+    async def run():
+        task = tracker.spawn(asyncio.sleep(10))
+        finished = await tracker.drain(0)
+        await asyncio.sleep(0)
+        return finished, task.cancelled()
+
+    assert asyncio.run(run()) == (False, True)
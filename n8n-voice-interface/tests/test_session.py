@@ -0,0 +1,86 @@
+import asyncio
+
+from backend.session import HistoryLog, SessionStorage
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.readlines()
+
+
+def test_history_is_restored_after_restart(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    storage = SessionStorage(history_log_path=path)
+    storage.append_history("a", "user", "cześć")
+    storage.append_history("a", "assistant", "dzień dobry")
+    storage.close()
+
+    restored = SessionStorage(history_log_path=path)
+    asyncio.run(restored.restore_history())
+
+    assert [m["text"] for m in restored.get_context("a")] == ["cześć", "dzień dobry"]
+    restored.close()
+
+
+def test_messages_added_during_restore_follow_restored_ones(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    storage = SessionStorage(history_log_path=path)
+    asyncio.run(storage.restore_history())
+    storage.append_history("a", "user", "stara")
+    storage.append_history("b", "user", "inna")
+    storage.close()
+
+    restored = SessionStorage(history_log_path=path)
+    restored.append_history("a", "user", "nowa")
+    restored.append_history("c", "user", "nowa sesja")
+    asyncio.run(restored.restore_history())
+    restored.close()
+
+    assert list(restored.sessions) == ["b", "a", "c"]
+    assert [m["text"] for m in restored.get_context("a")] == ["stara", "nowa"]
+    log = HistoryLog(path)
+    assert [text for _, _, text, _ in log.load()] == ["inna", "stara", "nowa", "nowa sesja"]
+    log.close()
+
+
+def test_load_keeps_only_messages_within_limits(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    log = HistoryLog(path, max_messages=2, max_sessions=2)
+    log.load()
+    for i in range(5):
+        log.append("a", "user", f"a{i}", i)
+    log.append("b", "user", "b0", 10)
+    log.append("c", "user", "c0", 11)
+    log.close()
+
+    records = HistoryLog(path, max_messages=2, max_sessions=2).load()
+
+    assert [text for _, _, text, _ in records] == ["b0", "c0"]
+    assert len(read_lines(path)) == 2
+
+
+def test_log_is_compacted_while_appending(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    log = HistoryLog(path, max_messages=3, compact_every=10)
+    log.load()
+    for i in range(25):
+        log.append("a", "user", f"m{i}", i)
+    log.close()
+
+    lines = read_lines(path)
+
+    assert len(lines) <= 3 + 10
+    assert '"m24"' in lines[-1]
+
+
+def test_log_applies_history_token_limit(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    log = HistoryLog(path, max_messages=50, max_tokens=100)
+    log.load()
+    for i in range(20):
+        log.append("a", "user", "x" * 200 + str(i), i)
+    log.close()
+
+    records = HistoryLog(path, max_messages=50, max_tokens=100).load()
+
+    assert len(records) == 1 and records[0][2].endswith("19")
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from backend.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_with_same_key_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(3)))
+
+    results = asyncio.run(run())
+
+    assert results == [{"value": 42}] * 3 and len(calls) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 2, "in_flight": 0}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+
+    async def run():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")),
+                                    flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert flight.stats()["calls"] == 2
+
+
+def test_exception_is_shared_by_all_waiters():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("błąd API")
+
+    async def run():
+        return await asyncio.gather(flight.do("k", work), flight.do("k", work), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats() == {"calls": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "gotowe"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "gotowe"
+
+
+def test_key_depends_on_content():
+    assert SingleFlight.make_key(b"audio") == SingleFlight.make_key(b"audio")
+    assert SingleFlight.make_key(b"audio") != SingleFlight.make_key(b"audio2")
@@ -0,0 +1,53 @@
+import asyncio
+
+from backend.stt import SpeechToTextService, stitch_transcripts
+from backend.stt_router import SttRouter
+
+
+def test_words_repeated_on_overlapped_boundary_are_removed():
+    texts = ["Ala ma kota i psa.", "i psa. Pies jest duży", "duży i biały"]
+    assert stitch_transcripts(texts, [False, True, False]) == "Ala ma kota i psa. Pies jest duży duży i biały"
+
+
+def test_silent_boundaries_are_joined_unchanged():
+    assert stitch_transcripts(["tak", "tak, rozumiem"], [False, False]) == "tak tak, rozumiem"
+    assert stitch_transcripts(["to jest to", "to jest nowe"]) == "to jest to to jest nowe"
+
+
+def test_single_word_match_is_not_treated_as_overlap():
+    assert stitch_transcripts(["tak", "tak, rozumiem"], [False, True]) == "tak tak, rozumiem"
+    assert stitch_transcripts(["powiedział nie", "nie wiem"], [False, True]) == "powiedział nie nie wiem"
+
+
+def test_longest_overlap_is_removed_ignoring_case_and_punctuation():
+    texts = ["to jest to, co", "To co mówiłem"]
+    assert stitch_transcripts(texts, [False, True]) == "to jest to, co mówiłem"
+
+
+class FakeApiService(SpeechToTextService):
+    """Serwis STT z fałszywym API zliczającym wywołania"""
+
+    def __init__(self, router):
+        super().__init__(api_key="test", router=router)
+        self.api_calls = []
+
+    async def _transcribe(self, content, model, filename="audio.webm", content_type="audio/webm"):
+        self.api_calls.append(model)
+        await asyncio.sleep(0.01)
+        return {"text": f"tekst ({model})"}
+
+
+def test_identical_concurrent_uploads_share_one_routing_decision():
+    router = SttRouter(["quality", "fast"], latency_budget_ms=1000, duration_buckets=[5, 30], reprobe_every=1)
+    service = FakeApiService(router)
+    content = b"\x00" * 1000
+
+    async def run():
+        return await asyncio.gather(*(service.transcribe(content) for _ in range(3)))
+
+    results = asyncio.run(run())
+
+    assert len(service.api_calls) == 1
+    assert len({result["text"] for result in results}) == 1
+    assert len(router.stats()["recent_decisions"]) == 1
+    assert service.flight.stats()["coalesced"] == 2
@@ -0,0 +1,107 @@
+from backend.stt_router import SttRouter
+
+
+def route(router, duration, latencies, failures=()):
+    """Wybiera model i zapisuje zadane opóźnienie (lub błąd) jak fałszywy dostawca STT"""
+    decision = router.choose(duration)
+    model = decision["model"]
+    router.record(decision, latencies[model], model not in failures)
+    return decision
+
+
+def make_router(**kwargs):
+    return SttRouter(["quality", "fast"], latency_budget_ms=1000, duration_buckets=[5, 30], **kwargs)
+
+
+def test_models_without_measurements_are_tried_in_preference_order():
+    router = make_router()
+    latencies = {"quality": 3000, "fast": 300}
+
+    first = route(router, 2, latencies)
+    second = route(router, 2, latencies)
+
+    assert (first["model"], first["reason"]) == ("quality", "no_data")
+    assert (second["model"], second["reason"]) == ("fast", "no_data")
+
+
+def test_preferred_model_within_budget_is_kept():
+    router = make_router()
+    latencies = {"quality": 800, "fast": 300}
+
+    decisions = [route(router, 2, latencies) for _ in range(10)]
+
+    assert all(d["model"] == "quality" for d in decisions)
+    assert decisions[-1]["reason"] == "within_budget"
+
+
+def test_slow_preferred_model_is_routed_around():
+    router = make_router()
+    latencies = {"quality": 3000, "fast": 300}
+    route(router, 2, latencies)
+    route(router, 2, latencies)
+
+    decision = route(router, 2, latencies)
+
+    assert (decision["model"], decision["reason"]) == ("fast", "within_budget")
+    assert decision["predicted_ms"] == 300
+
+
+def test_buckets_are_routed_independently():
+    router = make_router()
+    route(router, 2, {"quality": 3000, "fast": 300})
+    route(router, 2, {"quality": 3000, "fast": 300})
+
+    decision = router.choose(60)
+
+    assert (decision["model"], decision["reason"]) == ("quality", "no_data")
+
+
+def test_fastest_model_is_used_when_none_fits_budget():
+    router = make_router()
+    latencies = {"quality": 5000, "fast": 2000}
+    route(router, 2, latencies)
+    route(router, 2, latencies)
+
+    decision = router.choose(2)
+
+    assert (decision["model"], decision["reason"]) == ("fast", "fastest_over_budget")
+
+
+def test_failed_model_is_reprobed_and_recovers():
+    router = make_router(reprobe_every=5)
+    latencies = {"quality": 500, "fast": 300}
+    route(router, 2, latencies, failures={"quality"})
+    route(router, 2, latencies)
+
+    decisions = [route(router, 2, latencies) for _ in range(5)]
+
+    assert [d["model"] for d in decisions] == ["fast"] * 4 + ["quality"]
+    assert decisions[-1]["reason"] == "reprobe"
+    assert router.predict("quality", 2) == 500
+    assert router.choose(2)["model"] == "quality"
+
+
+def test_reprobing_can_be_disabled():
+    router = make_router(reprobe_every=0)
+    latencies = {"quality": 500, "fast": 300}
+    route(router, 2, latencies, failures={"quality"})
+
+    decisions = [route(router, 2, latencies) for _ in range(50)]
+
+    assert {d["model"] for d in decisions[1:]} == {"fast"}
+
+
+def test_stats_report_counts_latencies_and_decisions():
+    router = make_router(costs_per_minute={"fast": 0.006})
+    latencies = {"quality": 3000, "fast": 300}
+    route(router, 2, latencies, failures={"quality"})
+    route(router, 60, latencies)
+
+    stats = router.stats()
+
+    assert stats["models"]["quality"]["errors"] == 1
+    assert stats["models"]["quality"]["latency_ms"]["0-5s"] == 3000
+    assert [d["success"] for d in stats["recent_decisions"]] == [False, True]
+    assert stats["recent_decisions"][1]["estimated_cost"] is None
+    assert router.choose(60)["estimated_cost"] == 0.006
+    assert router.choose(120)["bucket"] == ">=30s"